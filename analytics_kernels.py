@@ -0,0 +1,308 @@
+"""Offline reference for the kernels in wasm/analytics.wat.
+
+Each kernel is vectorized over NumPy float32 arrays, typically memory-mapped
+raw f32 files (the byte layout of a Float32Array), and walked in fixed-size
+slices so multi-gigabyte history exports are never loaded whole. By default
+the results reproduce the .wat semantics bit for bit: every add, multiply
+and divide is rounded to f32 and sums accumulate strictly left to right,
+carried from one slice to the next. Pass exact=False (--precise) to
+accumulate in float64 instead and see how far f32 accumulation drifts.
+
+    python analytics_kernels.py revenue.f32
+    python analytics_kernels.py revenue.f32 --against bookings.f32 --percentiles 90 95
+    python analytics_kernels.py revenue.f32 --precise --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Elements per slice; keeps each kernel's temporaries (differences, products)
+# cache-sized regardless of the series length
+CHUNK_SIZE = 1 << 16
+
+# percentile's radix select histograms 16 of the 32 key bits per pass
+RADIX_BITS = 16
+
+
+def open_series(path):
+    """Memory-map a raw little-endian f32 file read-only."""
+    if os.path.getsize(path) % 4:
+        raise ValueError(f"{path}: size is not a multiple of 4 bytes")
+    if not os.path.getsize(path):
+        return np.empty(0, dtype=np.float32)
+    return np.memmap(path, dtype="<f4", mode="r")
+
+
+def write_series(path, values):
+    """Write values as a raw f32 file that open_series (or a Float32Array) can read."""
+    np.asarray(values, dtype="<f4").tofile(path)
+
+
+def _as_f32(values):
+    # No copy for float32 arrays and memmaps; lists are converted the way a
+    # Float32Array assignment rounds JS numbers
+    return np.asarray(values, dtype=np.float32)
+
+
+def _slices(length):
+    for start in range(0, length, CHUNK_SIZE):
+        yield slice(start, min(start + CHUNK_SIZE, length))
+
+
+def _f32_sum(values, carry):
+    """Continue `sum = f32.add(sum, value)` over values, starting from carry."""
+    if not len(values):
+        return carry
+    buffer = np.empty(len(values) + 1, dtype=np.float32)
+    buffer[0] = carry
+    buffer[1:] = values
+    # accumulate is strictly sequential, unlike add.reduce's pairwise sum
+    np.add.accumulate(buffer, out=buffer)
+    return buffer[-1]
+
+
+def _accumulate(length, terms, exact):
+    """Sum each array terms(slice, dtype) returns over the whole series."""
+    dtype = np.float32 if exact else np.float64
+    totals = [dtype(0) for _ in terms(slice(0, 0), dtype)]
+    # Like the .wat, overflow to inf and NaN propagate silently
+    with np.errstate(all="ignore"):
+        for part in _slices(length):
+            values = terms(part, dtype)
+            if exact:
+                totals = [_f32_sum(value, total) for value, total in zip(values, totals)]
+            else:
+                totals = [total + np.add.reduce(value) for value, total in zip(values, totals)]
+    return totals
+
+
+def _count(length, exact):
+    # f32.convert_i32_s(len)
+    return np.float32(length) if exact else float(length)
+
+
+def _pair(x, y):
+    x, y = _as_f32(x), _as_f32(y)
+    if len(x) != len(y):
+        raise ValueError(f"series lengths differ: {len(x)} != {len(y)}")
+    return x, y
+
+
+def _time_index(part, dtype):
+    # batchAnalytics regresses against 0..n-1 stored in a Float32Array
+    return np.arange(part.start, part.stop, dtype=np.float64).astype(dtype)
+
+
+def _sort_keys(values):
+    """f32 values as uint32 keys in the order a Float32Array sorts them: -0 before 0, NaN last."""
+    bits = values.view(np.uint32)
+    # Flip every bit of negatives and only the sign bit of positives
+    keys = np.where(bits >> 31, ~bits, bits | np.uint32(0x80000000))
+    keys[np.isnan(values)] = 0xFFFFFFFF
+    return keys
+
+
+def _key_value(key):
+    bits = key ^ 0x80000000 if key >> 31 else ~key & 0xFFFFFFFF
+    return np.uint32(bits).view(np.float32)
+
+
+def _select(values, ranks):
+    """The values at ranks of the sorted series, in two passes over its slices.
+
+    A histogram of the keys' high bits finds the bucket holding each rank; a
+    histogram of the low bits within that bucket pins the exact key. Memory
+    stays at one slice and 2^16 counts however long the series is.
+    """
+    size = 1 << RADIX_BITS
+    counts = np.zeros(size, dtype=np.int64)
+    for part in _slices(len(values)):
+        counts += np.bincount(_sort_keys(values[part]) >> RADIX_BITS, minlength=size)
+    ends = np.cumsum(counts)
+    buckets = [int(np.searchsorted(ends, rank, side="right")) for rank in ranks]
+
+    low_counts = {bucket: np.zeros(size, dtype=np.int64) for bucket in buckets}
+    for part in _slices(len(values)):
+        keys = _sort_keys(values[part])
+        high = keys >> RADIX_BITS
+        for bucket, bucket_counts in low_counts.items():
+            bucket_counts += np.bincount(keys[high == bucket] & (size - 1), minlength=size)
+
+    selected = []
+    for rank, bucket in zip(ranks, buckets):
+        offset = rank - (ends[bucket] - counts[bucket])
+        low = int(np.searchsorted(np.cumsum(low_counts[bucket]), offset, side="right"))
+        selected.append(_key_value((bucket << RADIX_BITS) | low))
+    return selected
+
+
+def moving_average(values, exact=True):
+    """movingAverage: the sum of the series divided by its length."""
+    values = _as_f32(values)
+    (total,) = _accumulate(len(values), lambda part, dtype: (values[part].astype(dtype, copy=False),), exact)
+    with np.errstate(all="ignore"):
+        return float(total / _count(len(values), exact))
+
+
+def standard_deviation(values, mean=None, exact=True):
+    """standardDeviation: sqrt(sum((x - mean)^2) / n), with the mean from moving_average by default."""
+    values = _as_f32(values)
+    if mean is None:
+        mean = moving_average(values, exact)
+    # The mean crosses into the kernel as an f32 parameter
+    mean = np.float32(mean) if exact else float(mean)
+
+    def terms(part, dtype):
+        diff = values[part].astype(dtype, copy=False) - mean
+        return (diff * diff,)
+
+    (total,) = _accumulate(len(values), terms, exact)
+    with np.errstate(all="ignore"):
+        return float(np.sqrt(total / _count(len(values), exact)))
+
+
+def linear_regression_slope(x, y=None, exact=True):
+    """linearRegressionSlope: least-squares slope of y on x.
+
+    With a single series, the slope is taken against its index 0..n-1 like
+    the trend in batchAnalytics.
+    """
+    if y is None:
+        y = _as_f32(x)
+        load_x = _time_index
+    else:
+        x, y = _pair(x, y)
+        load_x = lambda part, dtype: x[part].astype(dtype, copy=False)
+
+    def terms(part, dtype):
+        xs, ys = load_x(part, dtype), y[part].astype(dtype, copy=False)
+        return xs, ys, xs * ys, xs * xs
+
+    sum_x, sum_y, sum_xy, sum_xx = _accumulate(len(y), terms, exact)
+    n = _count(len(y), exact)
+    with np.errstate(all="ignore"):
+        return float((n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x * sum_x))
+
+
+def percentile(values, p, exact=True, presorted=False):
+    """percentile: linear interpolation between the two ranks around p (0-100).
+
+    The kernel expects sorted input. Unless presorted is set, only the two
+    ranks needed are selected, by a radix select that streams the series in
+    slices, so a memory-mapped file is never copied into memory.
+    """
+    values = _as_f32(values)
+    length = len(values)
+    if not length:
+        raise ValueError("percentile of an empty series")
+    if not 0 <= p <= 100:
+        raise ValueError(f"percentile must be between 0 and 100, got {p}")
+
+    if exact:
+        index = np.float32(p) / np.float32(100) * np.float32(length - 1)
+    else:
+        index = p / 100 * (length - 1)
+    lower = int(index)  # i32.trunc_f32_s
+    upper = min(lower + 1, length - 1)
+    weight = index - (np.float32(lower) if exact else lower)
+
+    if presorted:
+        low, high = values[lower], values[upper]
+    else:
+        low, high = _select(values, (lower, upper))
+    if not exact:
+        low, high = float(low), float(high)
+    with np.errstate(all="ignore"):
+        return float(low + weight * (high - low))
+
+
+def correlation(x, y, exact=True):
+    """correlation: Pearson's r from running sums, 0 when either series is constant."""
+    x, y = _pair(x, y)
+
+    def terms(part, dtype):
+        xs, ys = x[part].astype(dtype, copy=False), y[part].astype(dtype, copy=False)
+        return xs, ys, xs * ys, xs * xs, ys * ys
+
+    sum_x, sum_y, sum_xy, sum_xx, sum_yy = _accumulate(len(x), terms, exact)
+    n = _count(len(x), exact)
+    with np.errstate(all="ignore"):
+        numerator = n * sum_xy - sum_x * sum_y
+        denominator = np.sqrt((n * sum_xx - sum_x * sum_x) * (n * sum_yy - sum_y * sum_y))
+        if denominator == 0:
+            return 0.0
+        return float(numerator / denominator)
+
+
+def matrix_multiply(a, b, exact=True):
+    """matrixMultiply: C = A @ B, each C[i][j] summed over k in order."""
+    a, b = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+    if a.ndim != 2 or b.ndim != 2 or a.shape[1] != b.shape[0]:
+        raise ValueError(f"cannot multiply {a.shape} by {b.shape}")
+    if not exact:
+        return a.astype(np.float64) @ b.astype(np.float64)
+
+    # One rank-1 update per k keeps the .wat summation order for every
+    # element while each step is still a whole-matrix operation
+    product = np.zeros((a.shape[0], b.shape[1]), dtype=np.float32)
+    for k in range(a.shape[1]):
+        product += np.multiply.outer(a[:, k], b[k, :])
+    return product
+
+
+def summarize(values, against=None, percentiles=(95,), exact=True):
+    """The statistics batchAnalytics reports for one series."""
+    mean = moving_average(values, exact)
+    summary = {
+        "count": len(values),
+        "mean": mean,
+        "std": standard_deviation(values, mean, exact),
+        "trend": linear_regression_slope(values, exact=exact),
+    }
+    if len(values):
+        for p in percentiles:
+            summary[f"p{p:g}"] = percentile(values, p, exact)
+    if against is not None:
+        summary["correlation"] = correlation(values, against, exact)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the wasm analytics kernels over raw f32 history files")
+    parser.add_argument("series", help="raw little-endian f32 file")
+    parser.add_argument("--against", help="second f32 series of the same length to correlate with")
+    parser.add_argument("--percentiles", type=float, nargs="*", default=[95])
+    parser.add_argument("--precise", action="store_true", help="accumulate in float64 instead of f32")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        values = open_series(args.series)
+        against = open_series(args.against) if args.against else None
+        summary = summarize(values, against, args.percentiles, exact=not args.precise)
+    except (OSError, ValueError) as exc:
+        print(f"✗ {exc}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        print(f"{args.series}: {summary.pop('count'):,} values ({'float64' if args.precise else 'f32'} accumulation)")
+        for name, value in summary.items():
+            print(f"  {name:<12} {value:.9g}")
+
+    megabytes = values.nbytes * (2 if against is not None else 1) / 1e6
+    print(f"✓ {megabytes:,.1f} MB in {elapsed:.2f}s ({megabytes / max(elapsed, 1e-9):,.0f} MB/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
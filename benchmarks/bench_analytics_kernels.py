@@ -0,0 +1,324 @@
+"""Check analytics_kernels against the wasm/analytics.wat semantics and time it.
+
+Three passes:
+
+* correctness: the vectorized kernels must agree bit for bit with a literal,
+  instruction-by-instruction port of each .wat function, and with the
+  compiled module itself when the optional wasmtime package is installed
+* accumulation error: how far the f32 results drift from float64
+  accumulation as series grow
+* throughput: values per second over memory-mapped f32 files
+
+Run from the repository root:
+
+    python -m benchmarks.bench_analytics_kernels --sizes 10000 1000000 10000000
+"""
+
+import argparse
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+import analytics_kernels as kernels
+
+try:
+    import wasmtime
+except ImportError:  # optional: only needed to run the compiled module
+    wasmtime = None
+
+WAT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wasm", "analytics.wat")
+
+
+# --- Literal port of the .wat functions ---
+
+# Rounding a double result to f32 is exact emulation of f32 add, sub, mul,
+# div and sqrt: a double carries more than 2 * 24 + 2 significand bits
+def _f32(value):
+    return struct.unpack("<f", struct.pack("<f", value))[0]
+
+
+def wat_moving_average(data):
+    total = 0.0
+    for value in data:
+        total = _f32(total + value)
+    return _f32(total / _f32(len(data))) if data else float("nan")
+
+
+def wat_standard_deviation(data, mean):
+    mean = _f32(mean)
+    variance = 0.0
+    for value in data:
+        diff = _f32(value - mean)
+        variance = _f32(variance + _f32(diff * diff))
+    return _f32(_f32(variance / _f32(len(data))) ** 0.5)
+
+
+def wat_linear_regression_slope(xs, ys):
+    sum_x = sum_y = sum_xy = sum_xx = 0.0
+    n = _f32(len(xs))
+    for x, y in zip(xs, ys):
+        sum_x = _f32(sum_x + x)
+        sum_y = _f32(sum_y + y)
+        sum_xy = _f32(sum_xy + _f32(x * y))
+        sum_xx = _f32(sum_xx + _f32(x * x))
+    numerator = _f32(_f32(n * sum_xy) - _f32(sum_x * sum_y))
+    denominator = _f32(_f32(n * sum_xx) - _f32(sum_x * sum_x))
+    return _f32(numerator / denominator)
+
+
+def wat_percentile(data, p):
+    index = _f32(_f32(_f32(p) / 100) * _f32(len(data) - 1))
+    lower = int(index)
+    upper = min(lower + 1, len(data) - 1)
+    weight = _f32(index - lower)
+    return _f32(data[lower] + _f32(weight * _f32(data[upper] - data[lower])))
+
+
+def wat_correlation(xs, ys):
+    sum_x = sum_y = sum_xy = sum_x2 = sum_y2 = 0.0
+    n = _f32(len(xs))
+    for x, y in zip(xs, ys):
+        sum_x = _f32(sum_x + x)
+        sum_y = _f32(sum_y + y)
+        sum_xy = _f32(sum_xy + _f32(x * y))
+        sum_x2 = _f32(sum_x2 + _f32(x * x))
+        sum_y2 = _f32(sum_y2 + _f32(y * y))
+    numerator = _f32(_f32(n * sum_xy) - _f32(sum_x * sum_y))
+    spread = _f32(
+        _f32(_f32(n * sum_x2) - _f32(sum_x * sum_x)) * _f32(_f32(n * sum_y2) - _f32(sum_y * sum_y))
+    )
+    denominator = _f32(spread ** 0.5) if spread >= 0 else float("nan")
+    return 0.0 if denominator == 0 else _f32(numerator / denominator)
+
+
+def wat_matrix_multiply(a, b, m, n, p):
+    c = [0.0] * (m * p)
+    for i in range(m):
+        for j in range(p):
+            total = 0.0
+            for k in range(n):
+                total = _f32(total + _f32(a[i * n + k] * b[k * p + j]))
+            c[i * p + j] = total
+    return c
+
+
+class CompiledKernels:
+    """wasm/analytics.wat instantiated with wasmtime, fed the way wasm-analytics.ts does."""
+
+    def __init__(self, path=WAT_PATH):
+        engine = wasmtime.Engine()
+        self.store = wasmtime.Store(engine)
+        with open(path) as f:
+            module = wasmtime.Module(engine, f.read())
+        self.memory = wasmtime.Memory(self.store, wasmtime.MemoryType(wasmtime.Limits(10, None)))
+        log = wasmtime.Func(self.store, wasmtime.FuncType([wasmtime.ValType.i32()], []), lambda value: None)
+        self.exports = wasmtime.Instance(self.store, module, [self.memory, log]).exports(self.store)
+        self.reset()
+
+    def reset(self):
+        # The service's bump allocator starts after the first KiB
+        self.next = 1024
+
+    def allocate(self, data):
+        data = np.asarray(data, dtype="<f4")
+        pointer, self.next = self.next, self.next + data.nbytes
+        pages = -(-self.next // 65536) - self.memory.size(self.store)
+        if pages > 0:
+            self.memory.grow(self.store, pages)
+        self.memory.write(self.store, data.tobytes(), pointer)
+        return pointer
+
+    def call(self, name, *args):
+        return self.exports[name](self.store, *args)
+
+    def matrix_multiply(self, a, b):
+        (m, n), p = a.shape, b.shape[1]
+        a_ptr, b_ptr = self.allocate(a.ravel()), self.allocate(b.ravel())
+        c_ptr = self.allocate(np.zeros(m * p, dtype=np.float32))
+        self.call("matrixMultiply", a_ptr, b_ptr, c_ptr, m, n, p)
+        return np.frombuffer(self.memory.read(self.store, c_ptr, c_ptr + m * p * 4), dtype="<f4")
+
+
+# --- Data ---
+
+def synthetic_series(size, seed=0):
+    """Revenue, booking-count and rating series shaped like dashboard history."""
+    rng = np.random.default_rng(seed)
+    days = np.arange(size)
+    revenue = np.round(rng.gamma(2.0, 60.0, size) + days * 0.01 + 40 * np.sin(days / 7), 2)
+    bookings = rng.poisson(12 + revenue / 50)
+    ratings = np.round(np.clip(rng.normal(4.4, 0.5, size), 1, 5), 1)
+    return {
+        "revenue": revenue.astype(np.float32),
+        "bookings": bookings.astype(np.float32),
+        "ratings": ratings.astype(np.float32),
+    }
+
+
+def _bits(value):
+    return np.float32(value).view(np.uint32)
+
+
+def _same(expected, actual):
+    expected, actual = np.float32(expected), np.float32(actual)
+    if np.isnan(expected) or np.isnan(actual):
+        return bool(np.isnan(expected) and np.isnan(actual))
+    return _bits(expected) == _bits(actual)
+
+
+# --- Passes ---
+
+def check_correctness(sizes, compiled):
+    """Compare every kernel with the literal port (and wasm); returns the number of mismatches."""
+    failures = 0
+    for size in sizes:
+        series = synthetic_series(size, seed=size)
+        revenue, bookings = series["revenue"], series["bookings"]
+        data, other = revenue.tolist(), bookings.tolist()
+        ordered = np.sort(revenue)
+        mean = wat_moving_average(data)
+        time_index = np.arange(size, dtype=np.float32)
+
+        cases = [
+            ("movingAverage", kernels.moving_average(revenue), wat_moving_average(data),
+             lambda w: w.call("movingAverage", w.allocate(revenue), size)),
+            ("standardDeviation", kernels.standard_deviation(revenue), wat_standard_deviation(data, mean),
+             lambda w: w.call("standardDeviation", w.allocate(revenue), size, mean)),
+            ("linearRegressionSlope", kernels.linear_regression_slope(revenue),
+             wat_linear_regression_slope(time_index.tolist(), data),
+             lambda w: w.call("linearRegressionSlope", w.allocate(time_index), w.allocate(revenue), size)),
+            ("percentile", kernels.percentile(revenue, 95), wat_percentile(ordered.tolist(), 95),
+             lambda w: w.call("percentile", w.allocate(ordered), size, 95.0)),
+            ("correlation", kernels.correlation(revenue, bookings), wat_correlation(data, other),
+             lambda w: w.call("correlation", w.allocate(revenue), w.allocate(bookings), size)),
+        ]
+        for name, vectorized, port, run_compiled in cases:
+            results = [port]
+            if compiled is not None:
+                compiled.reset()
+                results.append(run_compiled(compiled))
+            ok = all(_same(result, vectorized) for result in results)
+            failures += not ok
+            print(
+                f"  {'✓' if ok else '✗'} {name:<22} n={size:<8,} {vectorized:.9g}"
+                + ("" if ok else f"  expected {', '.join(f'{r:.9g}' for r in results)}")
+            )
+
+    rng = np.random.default_rng(1)
+    a = np.round(rng.normal(0, 10, (12, 37)), 2).astype(np.float32)
+    b = np.round(rng.normal(0, 10, (37, 9)), 2).astype(np.float32)
+    vectorized = kernels.matrix_multiply(a, b).ravel()
+    results = [np.array(wat_matrix_multiply(a.ravel().tolist(), b.ravel().tolist(), 12, 37, 9), dtype=np.float32)]
+    if compiled is not None:
+        compiled.reset()
+        results.append(compiled.matrix_multiply(a, b))
+    ok = all(np.array_equal(_bits(result), _bits(vectorized)) for result in results)
+    failures += not ok
+    print(f"  {'✓' if ok else '✗'} {'matrixMultiply':<22} 12x37 @ 37x9")
+    return failures
+
+
+def _relative_error(exact, precise):
+    if precise == 0:
+        return abs(exact)
+    return abs(exact - precise) / abs(precise)
+
+
+def accumulation_error(sizes):
+    names = ("mean", "std", "trend", "p95", "correlation")
+    print(f"  {'n':>11} " + " ".join(f"{name:>12}" for name in names))
+    for size in sizes:
+        series = synthetic_series(size)
+        exact = kernels.summarize(series["revenue"], series["bookings"], exact=True)
+        precise = kernels.summarize(series["revenue"], series["bookings"], exact=False)
+        print(f"  {size:>11,} " + " ".join(f"{_relative_error(exact[name], precise[name]):>12.2e}" for name in names))
+
+
+def _best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def throughput(size, repeat, compiled):
+    series = synthetic_series(size)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {}
+        for name in ("revenue", "bookings"):
+            paths[name] = os.path.join(directory, f"{name}.f32")
+            kernels.write_series(paths[name], series[name])
+        del series
+        revenue, bookings = kernels.open_series(paths["revenue"]), kernels.open_series(paths["bookings"])
+
+        # The port and the compiled module run on a sample; rates are per value
+        sample = np.array(revenue[:min(size, 20000)])
+        sample_list = sample.tolist()
+        runs = [
+            ("movingAverage", lambda exact: kernels.moving_average(revenue, exact),
+             lambda: wat_moving_average(sample_list),
+             lambda w: w.call("movingAverage", w.allocate(sample), len(sample))),
+            ("standardDeviation", lambda exact: kernels.standard_deviation(revenue, 100.0, exact),
+             lambda: wat_standard_deviation(sample_list, 100.0),
+             lambda w: w.call("standardDeviation", w.allocate(sample), len(sample), 100.0)),
+            ("linearRegressionSlope", lambda exact: kernels.linear_regression_slope(revenue, exact=exact),
+             lambda: wat_linear_regression_slope(list(range(len(sample_list))), sample_list),
+             lambda w: w.call("linearRegressionSlope", w.allocate(np.arange(len(sample), dtype=np.float32)),
+                              w.allocate(sample), len(sample))),
+            ("correlation", lambda exact: kernels.correlation(revenue, bookings, exact),
+             lambda: wat_correlation(sample_list, sample_list),
+             lambda w: w.call("correlation", w.allocate(sample), w.allocate(sample), len(sample))),
+        ]
+
+        print(
+            f"  {'kernel':<22} {'f32 M/s':>9} {'f64 M/s':>9} {'port M/s':>9}"
+            + (f" {'wasm M/s':>9}" if compiled is not None else "")
+        )
+        for name, vectorized, port, run_compiled in runs:
+            rates = [
+                size / _best_of(lambda: vectorized(True), repeat) / 1e6,
+                size / _best_of(lambda: vectorized(False), repeat) / 1e6,
+                len(sample) / _best_of(port, 1) / 1e6,
+            ]
+            if compiled is not None:
+                def timed():
+                    compiled.reset()
+                    run_compiled(compiled)
+                rates.append(len(sample) / _best_of(timed, repeat) / 1e6)
+            print(f"  {name:<22} " + " ".join(f"{rate:>9.1f}" for rate in rates))
+        del revenue, bookings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check-sizes", type=int, nargs="+", default=[1000, 25000], help="series lengths to verify")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000, 10000000],
+                        help="series lengths for the error table; the largest is also timed")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    compiled = CompiledKernels() if wasmtime is not None else None
+    # Small slices so the f32 carry between slices is exercised by the check
+    chunk_size, kernels.CHUNK_SIZE = kernels.CHUNK_SIZE, 4096
+    try:
+        print("Correctness against the .wat semantics"
+              + ("" if compiled is not None else " (wasmtime not installed, checking the port only)"))
+        failures = check_correctness(args.check_sizes, compiled)
+    finally:
+        kernels.CHUNK_SIZE = chunk_size
+
+    print("\nRelative error of f32 accumulation against float64")
+    accumulation_error(args.sizes)
+
+    print(f"\nThroughput over memory-mapped f32 files, n={max(args.sizes):,} (million values/s)")
+    throughput(max(args.sizes), args.repeat, compiled)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,341 @@
+"""Regression benchmark for the route codemod, checked against stored baselines.
+
+Generates synthetic app/api trees of 50, 500 and 5,000 routes covering every
+rule (eager Supabase setup, module-level Stripe, inline per-request clients,
+already fixed and unrelated routes) and measures:
+
+* read, match, rewrite and write, summed over every file: reading and
+  decoding, tokenizing (the structure every rule matches against), running
+  the rules, and writing the changed files back
+* end_to_end: fix_remaining_routes.run() on a fresh tree, cache disabled
+* peak_mb: peak Python heap of that run, from tracemalloc
+
+Results are compared with benchmarks/baselines/codemod.json. Times are
+scaled by a calibration workload so a baseline recorded on one machine stays
+meaningful on another; any metric slower than the baseline by more than the
+threshold fails the run.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_codemod               # compare, exit 1 on regression
+    python -m benchmarks.bench_codemod --update      # record new baselines
+    python -m benchmarks.bench_codemod --sizes 50 500 --threshold 0.5
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from fix_remaining_routes import CHANGED, apply_rules, rules, run
+from route_tokenizer import RouteSource
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "codemod.json")
+
+STAGES = ("read", "match", "rewrite", "write")
+TIMED = STAGES + ("end_to_end",)
+
+DEFAULT_THRESHOLD = 0.25
+# Differences below this are scheduler noise, whatever the ratio
+NOISE_FLOOR_MS = 5.0
+
+IMPORTS = """import {{ NextResponse }} from 'next/server';
+import {{ createClient }} from '@supabase/supabase-js';
+{extra}
+export const dynamic = 'force-dynamic';
+"""
+
+EAGER_SUPABASE = """
+// Initialize Supabase client
+const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
+const supabaseServiceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY!;
+const supabase = createClient(supabaseUrl, supabaseServiceRoleKey);
+"""
+
+LAZY_SUPABASE = """
+// Lazy initialization to avoid build-time evaluation
+const getSupabase = () => {
+  const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
+  const supabaseServiceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY!;
+  return createClient(supabaseUrl, supabaseServiceRoleKey);
+};
+"""
+
+EAGER_STRIPE = """
+// Initialize Stripe
+const stripe = new Stripe(process.env.STRIPE_SECRET_KEY!, {
+  apiVersion: '2024-06-20' as Stripe.LatestApiVersion,
+});
+"""
+
+HELPER = """
+type Row{index} = {{ id: string; name: string; created_at: string; amount: number | null }};
+
+// Normalize rows before they leave the API
+const toRow{index} = (row: Row{index}) => ({{
+  id: row.id,
+  label: `${{row.name}} (#{index})`,
+  createdAt: new Date(row.created_at).toISOString(),
+  amount: row.amount ?? 0,
+}});
+
+function validate{index}(body: any): string | null {{
+  if (!body || typeof body.name !== 'string') {{
+    return 'name is required';
+  }}
+  if (body.name.length > 120 || /[<>]/.test(body.name)) {{
+    return 'name is invalid';
+  }}
+  return null;
+}}
+"""
+
+HANDLER = """
+export async function {method}(request: Request) {{
+  try {{
+{setup}    const body = '{method}' === 'GET' ? null : await request.json().catch(() => null);
+    const problem = body ? validate{index}(body) : null;
+    if (problem) {{
+      return NextResponse.json({{ error: problem }}, {{ status: 400 }});
+    }}
+    const {{ data, error }} = await {client}.from('table_{index}').select('*').limit(50);
+    if (error) {{
+      console.error('Error in {method} table_{index}:', error);
+      return NextResponse.json({{ error: error.message }}, {{ status: 500 }});
+    }}
+{extra}    return NextResponse.json((data ?? []).map(toRow{index}));
+  }} catch (error: any) {{
+    return NextResponse.json({{ error: 'Internal Server Error' }}, {{ status: 500 }});
+  }}
+}}
+"""
+
+INLINE_CLIENT = (
+    "    const supabase = createClient(process.env.NEXT_PUBLIC_SUPABASE_URL!, "
+    "process.env.SUPABASE_SERVICE_ROLE_KEY!);\n"
+)
+STRIPE_CALL = "    const balance = await stripe.balance.retrieve();\n    console.log(balance.available.length);\n"
+
+
+def synthetic_route(kind, index, rng):
+    """One route.ts of the given kind with two to four handlers."""
+    methods = rng.sample(["GET", "POST", "PUT", "DELETE", "PATCH"], rng.randint(2, 4))
+    extra_imports = {
+        "stripe": "import Stripe from 'stripe';\n",
+        "plain": "import { catalog } from '@/lib/catalog';\n",
+    }
+    parts = [IMPORTS.format(extra=extra_imports.get(kind, ""))]
+    setup, client, extra = "", "supabase", ""
+
+    if kind == "eager":
+        parts.append(EAGER_SUPABASE)
+    elif kind == "lazy":
+        parts.append(LAZY_SUPABASE)
+        setup = "    const supabase = getSupabase();\n"
+    elif kind == "stripe":
+        parts.append(LAZY_SUPABASE)
+        parts.append(EAGER_STRIPE)
+        setup, extra = "    const supabase = getSupabase();\n", STRIPE_CALL
+    elif kind == "inline":
+        setup = INLINE_CLIENT
+    else:
+        client = "catalog"
+
+    parts.append(HELPER.format(index=index))
+    for method in methods:
+        parts.append(HANDLER.format(method=method, index=index, setup=setup, client=client, extra=extra))
+    return "".join(parts)
+
+
+def synthetic_tree(root, count, seed=0):
+    """Write count routes under root/app/api and return their paths."""
+    rng = random.Random(seed)
+    kinds = ["eager", "lazy", "stripe", "inline", "plain"]
+    paths = []
+    for index in range(count):
+        directory = os.path.join(root, "app", "api", f"group-{index % 50}", f"resource-{index}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "route.ts")
+        with open(path, "w") as f:
+            f.write(synthetic_route(kinds[index % len(kinds)], index, rng))
+        paths.append(path)
+    return paths
+
+
+def calibrate():
+    """Milliseconds for a fixed pure-Python workload, used to scale times across machines."""
+    rng = random.Random(42)
+    words = ["".join(rng.choice("abcdefghij") for _ in range(12)) for _ in range(20000)]
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        index = {}
+        for word in sorted(words):
+            index.setdefault(word[:3], []).append(word.upper())
+        json.dumps(index)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def staged_pass(paths, enabled):
+    """Per-stage seconds over every file, and how many files changed."""
+    totals = dict.fromkeys(STAGES, 0.0)
+    changed = 0
+    clock = time.perf_counter
+    for path in paths:
+        started = clock()
+        with open(path, "rb") as f:
+            content = f.read().decode("utf-8")
+        read = clock()
+        route = RouteSource(content)
+        matched = clock()
+        new_content = apply_rules(route, enabled).source
+        rewritten = clock()
+        if new_content != content:
+            with open(path, "wb") as f:
+                f.write(new_content.encode("utf-8"))
+            changed += 1
+        written = clock()
+
+        totals["read"] += read - started
+        totals["match"] += matched - read
+        totals["rewrite"] += rewritten - matched
+        totals["write"] += written - rewritten
+    return totals, changed
+
+
+def measure(size, enabled, workers, repeat):
+    """Best-of-repeat stage and end-to-end times in ms, plus peak heap, for one tree size."""
+    with tempfile.TemporaryDirectory() as directory:
+        pristine = os.path.join(directory, "pristine")
+        paths = [os.path.relpath(path, pristine) for path in synthetic_tree(pristine, size)]
+
+        def fresh_copy(name):
+            target = os.path.join(directory, name)
+            shutil.rmtree(target, ignore_errors=True)
+            shutil.copytree(pristine, target)
+            return [os.path.join(target, path) for path in paths]
+
+        best = dict.fromkeys(TIMED, float("inf"))
+        changed = 0
+        for _ in range(repeat):
+            stages, changed = staged_pass(fresh_copy("staged"), enabled)
+            for stage, seconds in stages.items():
+                best[stage] = min(best[stage], seconds * 1000)
+
+            tree = fresh_copy("run")
+            started = time.perf_counter()
+            results = run(tree, workers=workers, cache=None, enabled=enabled)
+            best["end_to_end"] = min(best["end_to_end"], (time.perf_counter() - started) * 1000)
+            if sum(status == CHANGED for _, status in results) != changed:
+                raise RuntimeError("staged pass and run() disagree on which files change")
+
+        # Traced separately: tracemalloc slows everything it watches
+        tree = fresh_copy("traced")
+        tracemalloc.start()
+        run(tree, workers=1, cache=None, enabled=enabled)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    result = {stage: round(best[stage], 2) for stage in TIMED}
+    result["total"] = round(sum(best[stage] for stage in STAGES), 2)
+    result["peak_mb"] = round(peak / 1e6, 2)
+    result["changed"] = changed
+    return result
+
+
+def regressions(results, baseline, threshold, scale):
+    """(size, metric, baseline, current) for every metric past the threshold."""
+    found = []
+    for size, current in results.items():
+        recorded = baseline.get("results", {}).get(size)
+        if recorded is None:
+            continue
+        for metric in TIMED + ("total",):
+            expected = recorded[metric] * scale
+            if current[metric] > expected * (1 + threshold) and current[metric] - expected > NOISE_FLOOR_MS:
+                found.append((size, metric, expected, current[metric]))
+        if current["peak_mb"] > recorded["peak_mb"] * (1 + threshold):
+            found.append((size, "peak_mb", recorded["peak_mb"], current["peak_mb"]))
+    return found
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results, calibration, enabled, workers):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = {
+        "calibration_ms": round(calibration, 2),
+        "python": platform.python_version(),
+        "rules": sorted(enabled),
+        "workers": workers,
+        "results": results,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000], help="routes per synthetic tree")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="run() pool size for end_to_end (1 = serial)")
+    parser.add_argument("--rule", action="append", choices=list(rules), dest="rules", help="default: every rule")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    enabled = args.rules or list(rules)
+    calibration = calibrate()
+    baseline = None if args.update else load_baseline(args.baseline)
+
+    print(f"{'routes':>7} " + " ".join(f"{name + ' ms':>14}" for name in TIMED) + f" {'peak MB':>8} {'changed':>8}")
+    results = {}
+    for size in args.sizes:
+        result = measure(size, enabled, args.workers, args.repeat)
+        results[str(size)] = result
+        print(
+            f"{size:>7,} " + " ".join(f"{result[name]:>14.1f}" for name in TIMED)
+            + f" {result['peak_mb']:>8.1f} {result['changed']:>8,}"
+        )
+
+    if args.update:
+        save_baseline(args.baseline, results, calibration, enabled, args.workers)
+        print(f"✓ Baseline written to {os.path.relpath(args.baseline)}")
+        return 0
+
+    if baseline is None:
+        print(f"✗ No baseline at {os.path.relpath(args.baseline)}; record one with --update")
+        return 1
+    if baseline.get("rules") != sorted(enabled) or baseline.get("workers") != args.workers:
+        print("✗ Baseline was recorded with different --rule/--workers settings; compare like with like")
+        return 1
+
+    scale = calibration / baseline["calibration_ms"]
+    found = regressions(results, baseline, args.threshold, scale)
+    for size, metric, expected, current in found:
+        print(f"✗ {size} routes: {metric} {current:.1f} vs baseline {expected:.1f} (+{current / expected - 1:.0%})")
+    if found:
+        return 1
+    print(f"✓ Within {args.threshold:.0%} of the baseline (machine speed factor {scale:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
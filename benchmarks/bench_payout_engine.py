@@ -0,0 +1,236 @@
+"""Compare the vectorized payout engine with a row-by-row port of the route.
+
+The csv rows are the month-end path (--fetch loads the same way) and should
+beat the loop; dicts and json are expected below 1x, since turning every
+booking into a dict already costs about what the loop does.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_payout_engine --sizes 10000 100000 1000000
+"""
+
+import argparse
+import csv
+import gc
+import json
+import math
+import os
+import random
+import tempfile
+import time
+
+from payout_engine import (
+    PLATFORM_COMMISSION_RATE,
+    compute_payouts,
+    load_bookings,
+    load_csv,
+    read_bookings,
+    transfer_list,
+)
+
+CSV_FIELDS = ["id", "amount", "instructor_id", "payment_type", "credit_value", "stripe_account_id", "studio_id"]
+
+PAYMENT_TYPES = ["card", "card", "cash", "credits", "credits", "free", None]
+
+
+def _js_round(value):
+    floor = math.floor(value)
+    return int(floor) + (value - floor >= 0.5)
+
+
+def _js_number(value):
+    """`typeof value === 'number' ? value : null`"""
+    return value if type(value) in (int, float) else None
+
+
+def reference_payouts(records):
+    """The aggregation loop of app/api/payouts/route.ts, one booking at a time."""
+    payouts = {}
+    for booking in records:
+        instructor = booking.get("instructors")
+        if isinstance(instructor, list):
+            instructor = instructor[0] if instructor else None
+        instructor_id = booking.get("instructor_id")
+        account = instructor.get("stripe_account_id") if instructor else None
+        if not instructor_id or not account:
+            continue
+
+        if booking.get("payment_type") == "credits":
+            base = _js_number(booking.get("credit_value"))
+        else:
+            base = _js_number(booking.get("amount"))
+        base = base if base is not None else 0
+        if base <= 0:
+            continue
+
+        net = base * (1 - PLATFORM_COMMISSION_RATE)
+        if instructor_id not in payouts:
+            payouts[instructor_id] = {"amount": 0, "destination": account, "booking_ids": []}
+        payouts[instructor_id]["amount"] += net
+        payouts[instructor_id]["booking_ids"].append(booking["id"])
+
+    return [
+        {
+            "instructor_id": instructor_id,
+            "destination": payout["destination"],
+            "amount": _js_round(payout["amount"] * 100),
+            "booking_ids": payout["booking_ids"],
+        }
+        for instructor_id, payout in payouts.items()
+    ]
+
+
+def _csv_number(value):
+    return float(value) if value else None
+
+
+def reference_from_csv(path):
+    """The route's loop over a flat CSV export, after mapping rows to its BookingRecord shape."""
+    with open(path, newline="") as f:
+        records = [
+            {
+                "id": row["id"],
+                "amount": _csv_number(row["amount"]),
+                "instructor_id": row["instructor_id"] or None,
+                "payment_type": row["payment_type"] or None,
+                "credit_value": _csv_number(row["credit_value"]),
+                "instructors": {"stripe_account_id": row["stripe_account_id"] or None},
+            }
+            for row in csv.DictReader(f)
+        ]
+    return reference_payouts(records)
+
+
+def synthetic_bookings(count, instructors, seed=0):
+    """Bookings shaped like the route's Supabase select, with the edge cases it skips."""
+    rng = random.Random(seed)
+    studios = [f"studio-{index}" for index in range(max(instructors // 20, 1))]
+    roster = []
+    for index in range(instructors):
+        account = None if index % 97 == 0 else f"acct_{index:06d}"
+        roster.append((f"instructor-{index}", {"stripe_account_id": account, "studio_id": rng.choice(studios)}))
+
+    records = []
+    for index in range(count):
+        instructor_id, instructor = rng.choice(roster)
+        payment_type = rng.choice(PAYMENT_TYPES)
+        amount = rng.randint(0, 12000) / 100 if payment_type != "free" else 0
+        # A few exports carry numeric strings, which the route does not pay
+        if rng.random() < 0.005:
+            amount = f"{amount:.2f}"
+        records.append({
+            "id": f"booking-{index}",
+            "amount": amount if rng.random() > 0.01 else None,
+            "instructor_id": instructor_id if rng.random() > 0.002 else None,
+            "payment_type": payment_type,
+            "credit_value": rng.randint(1, 4000) / 100 if payment_type == "credits" else None,
+            # PostgREST embeds a to-one join as an object; the route still
+            # accepts the odd single-element list
+            "instructors": [instructor] if index % 50 == 0 else instructor,
+        })
+    return records
+
+
+def write_exports(records, directory):
+    """The same bookings as a JSON export and as a flat CSV export; returns both paths."""
+    json_path = os.path.join(directory, "bookings.json")
+    csv_path = os.path.join(directory, "bookings.csv")
+    with open(json_path, "w") as f:
+        json.dump(records, f)
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        for booking in records:
+            instructor = booking["instructors"]
+            instructor = instructor[0] if isinstance(instructor, list) else instructor
+            flat = {**booking, **instructor}
+            writer.writerow(["" if flat[field] is None else flat[field] for field in CSV_FIELDS])
+    return json_path, csv_path
+
+
+def best_of(func, argument, repeat):
+    # Like timeit, with the collector paused so no run pays for another's garbage
+    best, result = float("inf"), None
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(argument)
+            best = min(best, time.perf_counter() - started)
+    finally:
+        if enabled:
+            gc.enable()
+    return best, result
+
+
+def mismatches(reference, transfers):
+    fields = ("instructor_id", "destination", "amount", "booking_ids")
+    if len(reference) != len(transfers):
+        return abs(len(reference) - len(transfers))
+    return sum(
+        1 for expected, actual in zip(reference, transfers)
+        if any(expected[field] != actual[field] for field in fields)
+    )
+
+
+def engine_payouts(records):
+    """Everything the engine does for a month-end run: load the columns, reduce, list transfers."""
+    bookings = load_bookings(records)
+    return transfer_list(bookings, compute_payouts(bookings))
+
+
+def engine_from_csv(path):
+    bookings = load_csv(path)
+    return transfer_list(bookings, compute_payouts(bookings))
+
+
+# Month-end runs by source: name, row-by-row run, engine run, and the run's
+# argument given the records and the export paths
+RUNS = [
+    ("dicts", reference_payouts, engine_payouts, lambda records, paths: records),
+    ("json", lambda path: reference_payouts(read_bookings(path)),
+     lambda path: engine_payouts(read_bookings(path)), lambda records, paths: paths[0]),
+    ("csv", reference_from_csv, engine_from_csv, lambda records, paths: paths[1]),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="bookings per run")
+    parser.add_argument("--instructors", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    # speedup is end to end, source in and transfers out: dicts start from the
+    # parsed Supabase response, json and csv include reading the export.
+    # reduce only sets the route's loop against the engine minus loading
+    print(
+        f"{'source':>6} {'bookings':>9} {'row ms':>9} {'engine ms':>10} {'speedup':>8} "
+        f"{'reduce ms':>10} {'reduce only':>12}  parity"
+    )
+    failed = False
+    for count in args.sizes:
+        records = synthetic_bookings(count, args.instructors)
+        reduce_time, _ = best_of(lambda b: transfer_list(b, compute_payouts(b)), load_bookings(records), args.repeat)
+        loop_time, _ = best_of(reference_payouts, records, args.repeat)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = write_exports(records, directory)
+            for name, reference_run, engine_run, source in RUNS:
+                argument = source(records, paths)
+                reference_time, reference = best_of(reference_run, argument, args.repeat)
+                engine_time, transfers = best_of(engine_run, argument, args.repeat)
+
+                wrong = mismatches(reference, transfers)
+                failed = failed or bool(wrong)
+                print(
+                    f"{name:>6} {count:>9,} {reference_time * 1000:>9.1f} {engine_time * 1000:>10.1f} "
+                    f"{reference_time / engine_time:>7.1f}x {reduce_time * 1000:>10.1f} "
+                    f"{loop_time / reduce_time:>11.1f}x  "
+                    + ("✓" if not wrong else f"✗ {wrong} transfer(s) differ")
+                )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
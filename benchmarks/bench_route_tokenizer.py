@@ -0,0 +1,107 @@
+"""Compare the tokenizer-based route rewrite with the original regex codemod.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_route_tokenizer --sizes 100 1000 5000
+"""
+
+import argparse
+import re
+import time
+
+from fix_remaining_routes import handlers, lazy_init, rewrite
+
+# The original DOTALL patterns, kept verbatim as the comparison baseline
+legacy_module_pattern = re.compile(
+    r'(\/\/ Initialize Supabase.*?\n)?const supabaseUrl = process\.env\.NEXT_PUBLIC_SUPABASE_URL!;\nconst supabaseServiceRoleKey = process\.env\.SUPABASE_SERVICE_ROLE_KEY!;\nconst supabase = createClient\(supabaseUrl, supabaseServiceRoleKey\);',
+    re.DOTALL,
+)
+legacy_handler_patterns = [
+    re.compile(fr'(export async function {handler}\(request: Request\) {{\n  try {{\n)')
+    for handler in handlers
+]
+
+
+def legacy_rewrite(content):
+    content = legacy_module_pattern.sub(lazy_init, content)
+    for pattern in legacy_handler_patterns:
+        content = pattern.sub(r'\1    const supabase = getSupabase();\n', content)
+    return content
+
+
+HEADER = """import { NextResponse } from 'next/server';
+import { createClient } from '@supabase/supabase-js';
+
+export const dynamic = 'force-dynamic';
+
+// Initialize Supabase client
+const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
+const supabaseServiceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY!;
+const supabase = createClient(supabaseUrl, supabaseServiceRoleKey);
+"""
+
+HELPER = """
+// Initialize Supabase-backed helper {index}
+const mapRow{index} = (row: {{ id: string; name: string }}) => {{
+  const label = `${{row.name}} (#{index})`;
+  return {{ id: row.id, label, pattern: /[a-z]+\\/{index}/i }};
+}};
+"""
+
+HANDLER = """
+export async function {method}(request: Request) {{
+  try {{
+    const {{ data, error }} = await supabase.from('table_{index}').select('*');
+    if (error) {{
+      return NextResponse.json({{ error: error.message }}, {{ status: 500 }});
+    }}
+    return NextResponse.json(data.map(mapRow{index}));
+  }} catch (error: any) {{
+    return NextResponse.json({{ error: 'Internal Server Error' }}, {{ status: 500 }});
+  }}
+}}
+"""
+
+
+def synthetic_route(blocks):
+    """A route with `blocks` helper/handler pairs.
+
+    Every helper carries an `// Initialize Supabase` comment that is not
+    followed by the client setup, which is what sends the lazy DOTALL
+    pattern scanning to the end of the file from each occurrence.
+    """
+    parts = [HEADER]
+    for index in range(blocks):
+        parts.append(HELPER.format(index=index))
+        parts.append(HANDLER.format(method=handlers[index % len(handlers)], index=index))
+    return "".join(parts)
+
+
+def best_of(func, content, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(content)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="helper/handler pairs per file")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'blocks':>8} {'bytes':>11} {'regex ms':>10} {'tokens ms':>10} {'speedup':>8}")
+    for blocks in args.sizes:
+        content = synthetic_route(blocks)
+        regex_time = best_of(legacy_rewrite, content, args.repeat)
+        token_time = best_of(rewrite, content, args.repeat)
+        print(
+            f"{blocks:>8} {len(content):>11,} {regex_time * 1000:>10.1f} "
+            f"{token_time * 1000:>10.1f} {regex_time / token_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,18 @@
-import re
+import argparse
+import difflib
+import glob
+import hashlib
+import json
 import os
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from route_clients import analyze_file, constructions, imported_names, local_scope, module_scope, print_report, report_to_dict
+from route_tokenizer import IDENT, RouteSource
 
 files_to_fix = [
     "app/api/credit-packs/[id]/route.ts",
@@ -14,6 +27,14 @@ files_to_fix = [
     "app/api/data-import/route.ts",
 ]
 
+API_ROOT = "app/api"
+
+# Bump when the cache format changes; edits to the rules themselves are
+# caught by the hash of RULE_SOURCES that is part of the cache key too
+CODEMOD_VERSION = 11
+CACHE_FILE = ".codemod-cache.json"
+RULE_SOURCES = ("fix_remaining_routes.py", "route_tokenizer.py", "route_clients.py")
+
 lazy_init = """// Lazy initialization to avoid build-time evaluation
 const getSupabase = () => {
   const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
@@ -21,29 +42,784 @@ const getSupabase = () => {
   return createClient(supabaseUrl, supabaseServiceRoleKey);
 };"""
 
-for file_path in files_to_fix:
-    if not os.path.exists(file_path):
-        print(f"✗ File not found: {file_path}")
-        continue
-    
-    with open(file_path, 'r') as f:
-        content = f.read()
-    
-    # Replace module-level initialization with lazy init
-    pattern = r'(\/\/ Initialize Supabase.*?\n)?const supabaseUrl = process\.env\.NEXT_PUBLIC_SUPABASE_URL!;\nconst supabaseServiceRoleKey = process\.env\.SUPABASE_SERVICE_ROLE_KEY!;\nconst supabase = createClient\(supabaseUrl, supabaseServiceRoleKey\);'
-    content = re.sub(pattern, lazy_init, content, flags=re.DOTALL)
-    
-    # Add getSupabase() call to each handler
-    handlers = ['GET', 'POST', 'PUT', 'DELETE', 'PATCH']
-    for handler in handlers:
-        # Pattern to match handler function start
-        pattern = fr'(export async function {handler}\(request: Request\) {{\n  try {{\n)'
-        replacement = fr'\1    const supabase = getSupabase();\n'
-        content = re.sub(pattern, replacement, content)
-    
-    with open(file_path, 'w') as f:
-        f.write(content)
-    
-    print(f"✓ Fixed {file_path}")
-
-print("Done!")
+service_import = "import { createServiceSupabase } from '@/lib/supabase';"
+
+handlers = ['GET', 'POST', 'PUT', 'DELETE', 'PATCH']
+
+# Initializer tokens of the eager client setup that gets replaced with lazy init
+supabase_init = {
+    "supabaseUrl": ("process", ".", "env", ".", "NEXT_PUBLIC_SUPABASE_URL", "!"),
+    "supabaseServiceRoleKey": ("process", ".", "env", ".", "SUPABASE_SERVICE_ROLE_KEY", "!"),
+    "supabase": ("createClient", "(", "supabaseUrl", ",", "supabaseServiceRoleKey", ")"),
+}
+
+# client variable -> (getter, factory it wraps, module-level singleton)
+client_getters = {
+    "supabase": ("getSupabase", "createSupabaseClient", "_supabaseInstance"),
+    "stripe": ("getStripe", "createStripeClient", "_stripeInstance"),
+}
+
+memo_getter = """let {instance}: ReturnType<typeof {factory}> | null = null;
+
+// Reuse one client across requests instead of building one per call
+const {getter} = () => {{
+  if (!{instance}) {{
+    {instance} = {factory}();
+  }}
+  return {instance};
+}};
+"""
+
+# Initializer tokens of the getSupabase helper written by lazy_init
+lazy_init_tokens = RouteSource(lazy_init).consts()[0].init
+
+indent_pattern = re.compile(r"[ \t]*")
+
+CHANGED = "changed"
+ALREADY_FIXED = "already fixed"
+NOT_MATCHED = "not matched"
+NOT_FOUND = "not found"
+
+
+def discover_routes(root=API_ROOT):
+    return sorted(glob.glob(os.path.join(root, "**", "route.ts"), recursive=True))
+
+
+# --- Profiling hooks ---
+# Opt-in: while fix_file profiles a route, rules charge the time and match
+# count of each pattern they try ("module" for top-level client setup, or
+# the handler name for one GET/POST/... body) to the rule that is running.
+
+_clock = time.perf_counter
+_profile = None
+
+
+class Profile:
+    """Seconds and match counts per rule and per (rule, pattern) for one file."""
+
+    def __init__(self):
+        self.rule = None
+        self.rules = {}
+        self.patterns = {}
+
+    def add(self, table, key, seconds, matches):
+        spent, count = table.get(key, (0.0, 0))
+        table[key] = (spent + seconds, count + matches)
+
+    def records(self, file_path):
+        for (rule, pattern), (seconds, matches) in self.patterns.items():
+            yield {
+                "event": "pattern", "file": file_path, "rule": rule, "pattern": pattern,
+                "ms": round(seconds * 1000, 3), "matches": matches,
+            }
+        for rule, (seconds, matches) in self.rules.items():
+            yield {
+                "event": "rule", "file": file_path, "rule": rule,
+                "ms": round(seconds * 1000, 3), "changed": bool(matches),
+            }
+
+
+def _record(pattern, started, matches):
+    """Charge the time since started and matches to pattern of the running rule."""
+    if _profile is not None:
+        _profile.add(_profile.patterns, (_profile.rule, pattern), _clock() - started, matches)
+
+
+# --- Rule registry ---
+# A rule transforms the in-memory source of one route and returns the new
+# text; `applied` tells whether a file already has the rule's end state.
+
+Rule = namedtuple("Rule", "name help transform applied")
+
+rules = {}
+default_rules = ["supabase-lazy-init"]
+
+
+def register_rule(name, help, applied):
+    def decorator(transform):
+        rules[name] = Rule(name, help, transform, applied)
+        return transform
+    return decorator
+
+
+def _line_indent(source, offset):
+    line_start = source.rfind("\n", 0, offset) + 1
+    return indent_pattern.match(source, line_start).group()
+
+
+def _line_span(source, decl, comment):
+    """Offsets of the whole lines holding decl, plus a `comment` block directly above it."""
+    start = source.rfind("\n", 0, decl.start) + 1
+    end = source.find("\n", decl.end)
+    end = len(source) if end == -1 else end + 1
+
+    cursor = start
+    while cursor > 0:
+        line_start = source.rfind("\n", 0, cursor - 1) + 1
+        line = source[line_start:cursor].strip()
+        if not line.startswith("//"):
+            break
+        if line.startswith(comment):
+            start = line_start
+        cursor = line_start
+    return start, end
+
+
+def _close_gap(source, start, end):
+    # Removing a block between two blank lines would leave a double gap
+    if source[end:end + 1] == "\n" and (start == 0 or source[start - 2:start] == "\n\n"):
+        end += 1
+    return start, end, ""
+
+
+def _replace_lines(source, decl, text, comment="// Initialize Supabase"):
+    """Replace the whole lines holding decl, plus a `comment` block directly above it."""
+    start, end = _line_span(source, decl, comment)
+    return _close_gap(source, start, end) if not text else (start, end, text)
+
+
+def _remove_lines(source, decls, comment="// Initialize Supabase"):
+    """Edits removing the lines holding decls, adjacent ones as a single block."""
+    spans = []
+    for decl in decls:
+        start, end = _line_span(source, decl, comment)
+        if spans and spans[-1][1] == start:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return [_close_gap(source, start, end) for start, end in spans]
+
+
+def _supabase_group(route, lo=0, hi=None, depth=0):
+    found = {}
+    for decl in route.consts(lo, hi, depth):
+        if supabase_init.get(decl.name) == decl.init:
+            found.setdefault(decl.name, decl)
+    if len(found) != len(supabase_init):
+        return []
+    return sorted(found.values(), key=lambda decl: decl.start)
+
+
+def _statement_end(route, index):
+    """End offset of the top-level statement at index, whether `;` or ASI ends it."""
+    tokens = route.tokens
+    end = route.statement_end(index)
+    if end < len(tokens) and tokens[end].value == ";":
+        return tokens[end].end
+    return tokens[end - 1].end
+
+
+def _imports(route):
+    """Yield (token index, end offset) of every top-level import statement."""
+    tokens = route.tokens
+    for index, token in enumerate(tokens):
+        if token.value == "import" and token.depth == 0 and route.starts_statement(index):
+            yield index, _statement_end(route, index)
+
+
+def _line_after(source, offset):
+    end = source.find("\n", offset)
+    return len(source) if end == -1 else end + 1
+
+
+def _helper_offset(route):
+    """Offset just past `export const dynamic` or the last top-level import."""
+    for decl in route.consts():
+        if decl.name == "dynamic":
+            return _line_after(route.source, decl.end)
+
+    anchor = None
+    for _, anchor in _imports(route):
+        pass
+    return 0 if anchor is None else _line_after(route.source, anchor)
+
+
+def _block_body(route, function):
+    return route.tokens[function.lo - 1].value == "{"
+
+
+def _binds(route, function, name):
+    """True if a top-level function declares name itself, as a parameter or a body-level const.
+
+    A const inside a nested block or callback only shadows name there, so it
+    does not count, except in the `try {` block _wire_functions declares into.
+    """
+    tokens = route.tokens
+    if any(token.value == name for token in tokens[function.name_index + 1:function.lo]):
+        return True
+    if not _block_body(route, function):
+        return False
+    lo, hi = function.lo, function.hi
+    scopes = [(lo, hi, tokens[lo - 1].depth + 1)]
+    if lo + 1 < hi and tokens[lo].value == "try" and tokens[lo + 1].value == "{":
+        scopes.append((lo + 2, route.partners[lo + 1], tokens[lo + 1].depth + 1))
+    return any(decl.name == name for lo, hi, depth in scopes for decl in route.consts(lo, hi, depth))
+
+
+def _stranded(route, name, decls, wired=True):
+    """True if removing decls leaves a use of name that nothing binds.
+
+    With wired, uses inside block-bodied top-level functions count as bound
+    because _wire_functions declares name there.
+    """
+    tokens = route.tokens
+    covered = [(route.index_at(decl.start), route.index_at(decl.end)) for decl in decls]
+    for function in route.callables():
+        if (wired and _block_body(route, function)) or _binds(route, function, name):
+            covered.append((function.lo, function.hi))
+    for index, token in enumerate(tokens):
+        if token.kind == IDENT and token.value == name and route.references(name, index, index + 1):
+            if not any(lo <= index < hi for lo, hi in covered):
+                return True
+    return False
+
+
+def _wire_functions(route, name, getter):
+    """Edits declaring `const name = getter();` in top-level functions that use name without binding it.
+
+    That covers the GET/POST/... handlers and the helpers they call.
+    """
+    source = route.source
+    tokens = route.tokens
+    edits = []
+    for function in route.callables():
+        started = _clock()
+        lo, hi = function.lo, function.hi
+        wired = _block_body(route, function) and route.references(name, lo, hi) and not _binds(route, function, name)
+        if wired:
+            if tokens[lo].value == "try" and tokens[lo + 1].value == "{":
+                anchor = tokens[lo + 1]
+                indent = _line_indent(source, tokens[lo].start) + "  "
+            else:
+                anchor = tokens[lo - 1]
+                indent = _line_indent(source, function.start) + "  "
+            edits.append((anchor.end, anchor.end, f"\n{indent}const {name} = {getter}();"))
+        _record(function.name if function.name in handlers else "helpers", started, int(wired))
+    return edits
+
+
+def _inline_supabase_edits(route, getter):
+    """Edits collapsing client setup built inline in handlers, as in payouts, to `getter()`."""
+    edits = []
+    for handler in route.handlers(handlers):
+        started = _clock()
+        local = []
+        if _block_body(route, handler):
+            body_depth = route.tokens[handler.lo - 1].depth + 1
+            local = _supabase_group(route, handler.lo, handler.hi, body_depth)
+        if local:
+            indent = _line_indent(route.source, local[0].start)
+            edits.append(_replace_lines(route.source, local[0], f"{indent}const supabase = {getter}();\n"))
+            edits.extend(_replace_lines(route.source, decl, "") for decl in local[1:])
+        _record(handler.name, started, 1 if local else 0)
+    return edits
+
+
+def _rename_calls(route, old, new):
+    tokens = route.tokens
+    edits = []
+    for index, token in enumerate(tokens[:-1]):
+        if token.kind == IDENT and token.value == old and tokens[index + 1].value == "(":
+            if index == 0 or tokens[index - 1].value not in (".", "?.", "function"):
+                edits.append((token.start, token.end, new))
+    return edits
+
+
+@register_rule(
+    "supabase-lazy-init",
+    "replace eager createClient() setup with a lazy getSupabase() getter",
+    applied=lambda route: route.defines("getSupabase"),
+)
+def supabase_lazy_init(route):
+    content = route.source
+    edits = []
+    defines_lazy = route.defines("getSupabase")
+
+    # Module-level client setup becomes the lazy getter, unless something
+    # the getter cannot be wired into still uses the removed bindings
+    started = _clock()
+    group = _supabase_group(route)
+    if group and any(_stranded(route, decl.name, group, wired=decl.name == "supabase") for decl in group):
+        _record("module", started, 0)
+        return content
+    if group:
+        edits.append(_replace_lines(content, group[0], lazy_init + "\n"))
+        edits.extend(_replace_lines(content, decl, "") for decl in group[1:])
+        defines_lazy = True
+    _record("module", started, 1 if group else 0)
+
+    inline_edits = _inline_supabase_edits(route, "getSupabase")
+    if inline_edits and not defines_lazy:
+        offset = _helper_offset(route)
+        edits.append((offset, offset, "\n" + lazy_init + "\n"))
+        defines_lazy = True
+    edits.extend(inline_edits)
+
+    # Only wire functions up in files that actually define getSupabase,
+    # otherwise discovery mode would break routes using other clients
+    if defines_lazy:
+        edits.extend(_wire_functions(route, "supabase", "getSupabase"))
+
+    return apply_edits(content, edits)
+
+
+@register_rule(
+    "supabase-service-client",
+    "switch routes to createServiceSupabase() from @/lib/supabase (fix-supabase-imports.sh)",
+    applied=lambda route: route.references("createServiceSupabase"),
+)
+def supabase_service_client(route):
+    content = route.source
+    edits = []
+
+    started = _clock()
+    group = _supabase_group(route)
+    if group and any(_stranded(route, decl.name, group, wired=decl.name == "supabase") for decl in group):
+        _record("module", started, 0)
+        return content
+    edits.extend(_remove_lines(content, group))
+
+    # A getSupabase helper left behind by the lazy-init rule is superseded too
+    for decl in route.consts():
+        if decl.name == "getSupabase" and decl.init == lazy_init_tokens:
+            edits.append(_replace_lines(content, decl, "", comment="// Lazy initialization"))
+            edits.extend(_rename_calls(route, "getSupabase", "createServiceSupabase"))
+            group = True
+    _record("module", started, 1 if group else 0)
+
+    inline_edits = _inline_supabase_edits(route, "createServiceSupabase")
+    if not group and not inline_edits:
+        return content
+    edits.extend(inline_edits)
+    edits.extend(_wire_functions(route, "supabase", "createServiceSupabase"))
+
+    if imported_names(route).get("createServiceSupabase") != ("createServiceSupabase", "@/lib/supabase"):
+        anchor = None
+        for index, end in _imports(route):
+            anchor = end
+            if "NextResponse" in content[route.tokens[index].start:end]:
+                break
+        offset = 0 if anchor is None else _line_after(content, anchor)
+        edits.append((offset, offset, service_import + "\n"))
+
+    content = apply_edits(content, edits)
+
+    # Drop the supabase-js import once nothing else uses createClient
+    route = RouteSource(content)
+    for index, end in _imports(route):
+        statement = content[route.tokens[index].start:end]
+        if "'@supabase/supabase-js'" in statement and "createClient" in statement:
+            uses = sum(
+                1 for token in route.tokens
+                if token.kind == IDENT and token.value == "createClient"
+            )
+            if uses == 1:
+                start = content.rfind("\n", 0, route.tokens[index].start) + 1
+                content = content[:start] + content[_line_after(content, end):]
+            break
+
+    return content
+
+
+@register_rule(
+    "stripe-lazy-init",
+    "replace a module-level `new Stripe(...)` client with a getStripe() function",
+    applied=lambda route: route.defines("getStripe"),
+)
+def stripe_lazy_init(route):
+    content = route.source
+    if route.defines("getStripe"):
+        return content
+
+    started = _clock()
+    for decl in route.consts():
+        if decl.name == "stripe" and decl.init[:3] == ("new", "Stripe", "(") and not _stranded(route, "stripe", [decl]):
+            break
+    else:
+        _record("module", started, 0)
+        return content
+    _record("module", started, 1)
+
+    init = content[decl.init_start:decl.init_end].replace("\n", "\n  ")
+    helper = f"// Initialize Stripe client only when needed\nfunction getStripe() {{\n  return {init};\n}}\n"
+    edits = [_replace_lines(content, decl, helper, comment="// Initialize Stripe")]
+    edits.extend(_wire_functions(route, "stripe", "getStripe"))
+    return apply_edits(content, edits)
+
+
+@register_rule(
+    "memoize-clients",
+    "cache shareable Supabase/Stripe clients in module-scope singleton getters (see --analyze)",
+    applied=lambda route: any(route.defines(instance) for _, _, instance in client_getters.values()),
+)
+def memoize_clients(route):
+    content = route.source
+    imports = imported_names(route)
+    scope = module_scope(route, imports)
+    callables = {c.name: c for c in route.callables()}
+    edits = []
+
+    for client, (getter, factory, instance) in client_getters.items():
+        if route.defines(instance) or route.defines(factory):
+            continue
+        names = dict(getter=getter, factory=factory, instance=instance)
+
+        # An existing per-call getter becomes the factory behind a cached one
+        existing = callables.get(getter)
+        if existing is not None:
+            started = _clock()
+            built = constructions(
+                route, existing.lo, existing.hi, imports,
+                scope | local_scope(route, existing.lo, existing.hi, scope),
+            )
+            memoized = bool(built) and all(cons.shareable for cons in built)
+            if memoized:
+                name = route.tokens[existing.name_index]
+                edits.append((name.start, name.end, factory))
+                offset = _line_after(content, existing.end)
+                edits.append((offset, offset, "\n" + memo_getter.format(**names)))
+            _record("module", started, 1 if memoized else 0)
+            continue
+
+        # Otherwise hoist a client built inline in handlers, as in payouts,
+        # or in the helpers they call, as in classes/meta
+        inline = []
+        for function in callables.values():
+            started = _clock()
+            found = len(inline)
+            for decl in route.consts(function.lo, function.hi, depth=None):
+                if decl.name != client:
+                    continue
+                lo, hi = route.index_at(decl.init_start), route.index_at(decl.init_end)
+                built = constructions(route, lo, hi, imports, scope)
+                if len(built) == 1 and built[0].client == client and built[0].shareable:
+                    inline.append(decl)
+            _record(function.name if function.name in handlers else "helpers", started, len(inline) - found)
+        if not inline or len({decl.init for decl in inline}) != 1:
+            continue
+
+        indent = _line_indent(content, inline[0].start)
+        init = content[inline[0].init_start:inline[0].init_end]
+        init = init.replace("\n" + indent, "\n").replace("\n", "\n  ")
+        comment = f"// Initialize {client.capitalize()}"
+        helper = f"{comment} client only when needed\nfunction {factory}() {{\n  return {init};\n}}\n"
+        offset = _helper_offset(route)
+        edits.append((offset, offset, "\n" + helper + "\n" + memo_getter.format(**names)))
+        for decl in inline:
+            decl_indent = _line_indent(content, decl.start)
+            edits.append(_replace_lines(content, decl, f"{decl_indent}const {client} = {getter}();\n", comment=comment))
+
+    return apply_edits(content, edits)
+
+
+def apply_edits(content, edits):
+    """Apply non-overlapping (start, end, text) edits in one pass."""
+    pieces = []
+    cursor = 0
+    for start, end, text in sorted(edits, key=lambda edit: edit[0]):
+        pieces.append(content[cursor:start])
+        pieces.append(text)
+        cursor = end
+    pieces.append(content[cursor:])
+    return "".join(pieces)
+
+
+def apply_rules(content, enabled=None):
+    """Stream one in-memory source through every enabled rule, in registry order.
+
+    content may also be an already tokenized RouteSource.
+    """
+    enabled = default_rules if enabled is None else enabled
+    route = content if isinstance(content, RouteSource) else RouteSource(content)
+    for rule in rules.values():
+        if rule.name not in enabled:
+            continue
+        if _profile is not None:
+            _profile.rule = rule.name
+            started = _clock()
+        new_content = rule.transform(route)
+        changed = new_content != route.source
+        if changed:
+            route = RouteSource(new_content)
+        if _profile is not None:
+            _profile.add(_profile.rules, rule.name, _clock() - started, changed)
+    return route
+
+
+def rewrite(content, enabled=None):
+    return apply_rules(content, enabled).source
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def rules_hash():
+    """Hash of the code the rules are made of, so any edit to it invalidates the cache."""
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in RULE_SOURCES:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_cache(enabled, cache_path=CACHE_FILE):
+    try:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+        written_ns = os.stat(cache_path).st_mtime_ns
+    except (OSError, ValueError):
+        return {}
+
+    if (
+        cache.get("version") != CODEMOD_VERSION
+        or cache.get("rules_hash") != rules_hash()
+        or cache.get("rules") != sorted(enabled)
+    ):
+        return {}
+
+    # "Racy" entries, as git calls them: a file changed within the clock tick
+    # the cache was written in can keep its mtime and size, so only the hash
+    # can be trusted for files not clearly older than the cache itself
+    files = cache.get("files", {})
+    for entry in files.values():
+        if entry.get("mtime_ns", written_ns) >= written_ns:
+            entry.pop("mtime_ns", None)
+    return files
+
+
+def save_cache(entries, enabled, cache_path=CACHE_FILE):
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(
+            {"version": CODEMOD_VERSION, "rules_hash": rules_hash(), "rules": sorted(enabled), "files": entries},
+            f, indent=2, sort_keys=True,
+        )
+    os.replace(tmp_path, cache_path)
+
+
+def unified_diff(file_path, old, new):
+    """A git-style unified diff of one route, built in memory."""
+    pieces = []
+    for line in difflib.unified_diff(
+        old.splitlines(keepends=True), new.splitlines(keepends=True), f"a/{file_path}", f"b/{file_path}",
+    ):
+        pieces.append(line)
+        if not line.endswith("\n"):
+            pieces.append("\n\\ No newline at end of file\n")
+    return "".join(pieces)
+
+
+# What fix_file did to one route; diff is set for changes under dry_run and
+# profile holds JSON-ready records when profiling was requested
+FileResult = namedtuple("FileResult", "path status entry diff profile")
+
+
+def fix_file(file_path, cached=None, enabled=None, dry_run=False, profile=False):
+    """Rewrite one route, returning a FileResult with the cache entry for what is left on disk.
+
+    The file is read once and written at most once, however many rules run.
+    With dry_run the file is never written: a change is returned as a diff.
+    """
+    global _profile
+    started = _clock()
+    timings = {"read_ms": 0.0, "rules_ms": 0.0, "write_ms": 0.0}
+    if profile:
+        _profile = Profile()
+
+    def done(status, entry, diff=None, from_cache=False):
+        records = None
+        if profile:
+            records = list(_profile.records(file_path))
+            records.append(dict(
+                {"event": "file", "file": file_path, "status": status, "cached": from_cache},
+                **{key: round(value * 1000, 3) for key, value in timings.items()},
+                total_ms=round((_clock() - started) * 1000, 3),
+            ))
+        return FileResult(file_path, status, entry, diff, records)
+
+    try:
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return done(NOT_FOUND, None)
+
+        # Untouched since the last run: skip without even reading it
+        if cached and cached.get("mtime_ns") == stat.st_mtime_ns and cached.get("size") == stat.st_size:
+            return done(cached["status"], cached, from_cache=True)
+
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        timings["read_ms"] = _clock() - started
+
+        digest = content_hash(data)
+        entry = {"hash": digest, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+        # Touched but identical content: the result is already known
+        if cached and cached.get("hash") == digest:
+            return done(cached["status"], dict(entry, status=cached["status"]), from_cache=True)
+
+        enabled = default_rules if enabled is None else enabled
+        content = data.decode('utf-8')
+        rules_started = _clock()
+        route = apply_rules(content, enabled)
+        timings["rules_ms"] = _clock() - rules_started
+
+        if route.source == content:
+            fixed = any(rules[name].applied(route) for name in enabled)
+            status = ALREADY_FIXED if fixed else NOT_MATCHED
+            return done(status, dict(entry, status=status))
+
+        # Nothing was written, so there is no new state worth caching
+        if dry_run:
+            return done(CHANGED, None, unified_diff(file_path, content, route.source))
+
+        write_started = _clock()
+        new_data = route.source.encode('utf-8')
+        with open(file_path, 'wb') as f:
+            f.write(new_data)
+        timings["write_ms"] = _clock() - write_started
+
+        stat = os.stat(file_path)
+        entry = {
+            "hash": content_hash(new_data),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "status": ALREADY_FIXED,
+        }
+        return done(CHANGED, entry)
+    finally:
+        _profile = None
+
+
+def _fix_file_args(args):
+    return fix_file(*args)
+
+
+def run(paths, workers=None, cache=None, enabled=None, dry_run=False, profile=False, on_result=None):
+    """Fix every path, calling on_result with each FileResult in path order as it completes."""
+    cache = {} if cache is None else cache
+    jobs = [(path, cache.get(path), enabled, dry_run, profile) for path in paths]
+
+    results = []
+
+    def collect(result):
+        if result.entry is None:
+            cache.pop(result.path, None)
+        else:
+            cache[result.path] = result.entry
+        if on_result is not None:
+            on_result(result)
+        results.append((result.path, result.status))
+
+    # A pool only pays for itself once there are enough files to spread out
+    if workers == 1 or len(paths) < 8:
+        for job in jobs:
+            collect(fix_file(*job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(_fix_file_args, jobs, chunksize=4):
+                collect(result)
+
+    return results
+
+
+def print_summary(results, file=None):
+    symbols = {CHANGED: "✓", ALREADY_FIXED: "·", NOT_MATCHED: "-", NOT_FOUND: "✗"}
+    for file_path, status in results:
+        print(f"{symbols[status]} {status}: {file_path}", file=file)
+
+    counts = {status: 0 for status in symbols}
+    for _, status in results:
+        counts[status] += 1
+    print(", ".join(f"{counts[status]} {status}" for status in symbols), file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply codemod rules to API routes")
+    parser.add_argument("--all", action="store_true", help=f"discover every {API_ROOT}/**/route.ts instead of the fixed list")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help=f"ignore and do not update {CACHE_FILE} (files older than it are skipped by mtime and size, newer ones by content hash)",
+    )
+    parser.add_argument(
+        "--rule", action="append", choices=list(rules), dest="rules",
+        help=f"enable a rule, repeatable (default: {', '.join(default_rules)})",
+    )
+    parser.add_argument("--analyze", action="store_true", help="report per-request Supabase/Stripe client construction instead of rewriting")
+    parser.add_argument("--json", action="store_true", help="with --analyze, print one JSON object per route")
+    parser.add_argument("--list-rules", action="store_true", help="show the available rules and exit")
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="print unified diffs to stdout instead of writing files (summary goes to stderr)",
+    )
+    parser.add_argument(
+        "--profile", metavar="PATH",
+        help="write per-file, per-rule and per-pattern timings as JSON lines to PATH "
+        "('-' for stdout, which moves the summary to stderr)",
+    )
+    parser.add_argument("paths", nargs="*", help="explicit route files to fix")
+    args = parser.parse_args(argv)
+
+    # Diffs and JSON lines on one stream would leave neither parseable
+    if args.dry_run and args.profile == "-":
+        parser.error("--dry-run writes diffs to stdout; give --profile a file path")
+
+    if args.list_rules:
+        for rule in rules.values():
+            marker = "*" if rule.name in default_rules else " "
+            print(f"{marker} {rule.name}: {rule.help}")
+        return
+
+    enabled = args.rules or default_rules
+
+    if args.paths:
+        paths = args.paths
+    elif args.all or args.analyze:
+        paths = discover_routes()
+    else:
+        paths = files_to_fix
+
+    if args.analyze:
+        reports = [analyze_file(path) for path in paths if os.path.exists(path)]
+        if args.json:
+            for report in reports:
+                print(json.dumps(report_to_dict(report)))
+        else:
+            print_report(reports)
+        return
+
+    cache = None if args.no_cache else load_cache(enabled)
+    profile_out = None
+    if args.profile:
+        profile_out = sys.stdout if args.profile == "-" else open(args.profile, "w")
+
+    def on_result(result):
+        if result.diff:
+            sys.stdout.write(result.diff)
+            sys.stdout.flush()
+        if result.profile:
+            for record in result.profile:
+                profile_out.write(json.dumps(record) + "\n")
+
+    try:
+        results = run(paths, args.workers, cache, enabled, args.dry_run, profile_out is not None, on_result)
+    finally:
+        if profile_out not in (None, sys.stdout):
+            profile_out.close()
+
+    # A dry run leaves the tree as it was, so the cache must not move on
+    if cache is not None and not args.dry_run:
+        save_cache(cache, enabled)
+
+    # stdout carries diffs or JSON lines; keep it machine-readable
+    summary = sys.stderr if args.dry_run or profile_out is sys.stdout else sys.stdout
+    print_summary(results, file=summary)
+    print("Done!", file=summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+"""Stream a studio CSV export into imported_classes in batches.
+
+Bulk companion to app/api/data-import: instead of loading the whole upload
+into memory and sending one insert, the CSV is parsed row by row, validated
+and coerced a chunk at a time, and written as batched inserts by a bounded
+pool of workers. Every committed batch is checkpointed so an interrupted
+import resumes where it stopped.
+
+    python import_classes.py export.csv                        # Supabase from env
+    python import_classes.py export.csv --database sqlite:///local.db
+    python import_classes.py export.csv --database postgresql://localhost/hobbyist
+"""
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+DEFAULT_TABLE = "imported_classes"
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CONCURRENCY = 4
+
+identifier_pattern = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class ImportFailed(Exception):
+    pass
+
+
+# --- Validation and coercion ---
+
+def _text(value):
+    return value
+
+
+def _decimal(value):
+    try:
+        number = Decimal(value.replace("$", "").replace(",", ""))
+    except InvalidOperation:
+        raise ValueError(f"not a number: {value!r}") from None
+    # NaN and Infinity parse fine but are not valid JSON or class data
+    if not number.is_finite():
+        raise ValueError(f"not a finite number: {value!r}")
+    return number
+
+
+def _integer(value):
+    number = _decimal(value)
+    if number != number.to_integral_value():
+        raise ValueError(f"not a whole number: {value!r}")
+    return int(number)
+
+
+def _money(value):
+    try:
+        return float(_decimal(value).quantize(Decimal("0.01")))
+    except InvalidOperation:
+        raise ValueError(f"out of range: {value!r}") from None
+
+
+def _boolean(value):
+    lowered = value.lower()
+    if lowered in ("true", "yes", "y", "1"):
+        return True
+    if lowered in ("false", "no", "n", "0"):
+        return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+def _timestamp(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).isoformat()
+
+
+# Known class columns and how to coerce them; other columns pass through as
+# text, the same way the API route inserts whatever the CSV headers are
+column_types = {
+    "name": _text,
+    "description": _text,
+    "category": _text,
+    "difficulty_level": _text,
+    "instructor_name": _text,
+    "price": _money,
+    "duration": _integer,
+    "max_participants": _integer,
+    "credits_required": _integer,
+    "is_active": _boolean,
+    "start_time": _timestamp,
+    "end_time": _timestamp,
+}
+
+required_columns = ("name",)
+
+
+def read_rows(path):
+    """Yield (line number, row) pairs straight off the file, one at a time."""
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            # Skip blank lines the same way csv-parse's skip_empty_lines does
+            if not any((value or "").strip() for value in row.values()):
+                continue
+            yield reader.line_num, row
+
+
+def coerce_row(row):
+    """Return a cleaned copy of row, raising ValueError on invalid data."""
+    clean = {}
+    for column, raw in row.items():
+        if column is None:
+            raise ValueError("more fields than headers")
+        key = column.strip()
+        value = (raw or "").strip()
+        if not value:
+            clean[key] = None
+            continue
+        try:
+            clean[key] = column_types.get(key, _text)(value)
+        except ValueError as exc:
+            raise ValueError(f"{key}: {exc}") from None
+        except ArithmeticError:
+            # Decimal signals and overflow must not abort the whole import
+            raise ValueError(f"{key}: out of range: {value!r}") from None
+
+    for column in required_columns:
+        if clean.get(column) is None:
+            raise ValueError(f"{column} is required")
+    return clean
+
+
+def coerce_chunk(numbered_rows):
+    """Split one chunk into (valid rows, [(line number, error)])."""
+    valid = []
+    errors = []
+    for line_num, row in numbered_rows:
+        try:
+            valid.append(coerce_row(row))
+        except ValueError as exc:
+            errors.append((line_num, str(exc)))
+    return valid, errors
+
+
+def batches(rows, batch_size, skip=0):
+    """Group the row stream into numbered chunks, skipping the first `skip` chunks."""
+    rows = iter(rows)
+    # Consume, but do not materialize, the chunks that are already committed
+    for _ in range(skip * batch_size):
+        if next(rows, None) is None:
+            return
+    index = skip
+    while True:
+        chunk = list(itertools.islice(rows, batch_size))
+        if not chunk:
+            return
+        yield index, chunk
+        index += 1
+
+
+# --- Destinations ---
+
+def _check_identifier(name):
+    if not identifier_pattern.match(name):
+        raise ImportFailed(f"invalid column or table name: {name!r}")
+    return f'"{name}"'
+
+
+class SQLSink:
+    """DB-API destination; each worker thread gets its own connection."""
+
+    placeholder = "?"
+
+    def __init__(self, table):
+        self.table = table
+        self._local = threading.local()
+
+    def connect(self):
+        raise NotImplementedError
+
+    def _connection(self):
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = self.connect()
+        return self._local.connection
+
+    def prepare(self, columns):
+        pass
+
+    def insert(self, rows, columns):
+        connection = self._connection()
+        names = ", ".join(_check_identifier(column) for column in columns)
+        values = ", ".join([self.placeholder] * len(columns))
+        statement = f"INSERT INTO {_check_identifier(self.table)} ({names}) VALUES ({values})"
+        params = [tuple(row.get(column) for column in columns) for row in rows]
+
+        # One transaction per batch so a checkpointed batch is all-or-nothing
+        try:
+            cursor = connection.cursor()
+            cursor.executemany(statement, params)
+            connection.commit()
+        except Exception as exc:
+            connection.rollback()
+            raise ImportFailed(f"insert into {self.table} failed: {exc}") from exc
+
+
+class SQLiteSink(SQLSink):
+    """Local stand-in for the Supabase table; creates it on first use."""
+
+    def __init__(self, table, path):
+        super().__init__(table)
+        self.path = path
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def prepare(self, columns):
+        connection = self.connect()
+        names = ", ".join(_check_identifier(column) for column in columns)
+        with connection:
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {_check_identifier(self.table)} ({names})")
+        connection.close()
+
+
+class PostgresSink(SQLSink):
+    placeholder = "%s"
+
+    def __init__(self, table, dsn):
+        super().__init__(table)
+        self.dsn = dsn
+
+    def connect(self):
+        try:
+            import psycopg
+        except ImportError:
+            try:
+                import psycopg2 as psycopg
+            except ImportError:
+                raise ImportFailed("PostgreSQL imports need psycopg or psycopg2 installed") from None
+        return psycopg.connect(self.dsn)
+
+
+class SupabaseSink:
+    """Bulk inserts through the PostgREST endpoint the API route uses."""
+
+    def __init__(self, table, url, key):
+        self.table = table
+        self.endpoint = f"{url.rstrip('/')}/rest/v1/{table}"
+        self.key = key
+
+    def prepare(self, columns):
+        pass
+
+    def insert(self, rows, columns):
+        body = json.dumps([{column: row.get(column) for column in columns} for row in rows]).encode()
+        request = urllib.request.Request(self.endpoint, data=body, method="POST", headers={
+            "apikey": self.key,
+            "Authorization": f"Bearer {self.key}",
+            "Content-Type": "application/json",
+            "Prefer": "return=minimal",
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+        except urllib.error.HTTPError as exc:
+            raise ImportFailed(f"Supabase insert failed ({exc.code}): {exc.read().decode(errors='replace')}") from None
+
+
+def open_sink(database, table):
+    if database is None:
+        url = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
+        key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+        if not url or not key:
+            raise ImportFailed("set NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY, or pass --database")
+        return SupabaseSink(table, url, key)
+    if database.startswith("sqlite:///"):
+        return SQLiteSink(table, database[len("sqlite:///"):])
+    if database.startswith(("postgres://", "postgresql://")):
+        return PostgresSink(table, database)
+    raise ImportFailed(f"unsupported database URL: {database}")
+
+
+# --- Checkpointing ---
+
+def fingerprint(path):
+    """Cheap identity for the source file: size plus a hash of its first 64 KiB."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        digest.update(f.read(64 * 1024))
+    return f"{os.path.getsize(path)}:{digest.hexdigest()}"
+
+
+class Checkpoint:
+    """Tracks committed batches; `watermark` is how many leading batches are all done."""
+
+    def __init__(self, path, source, batch_size):
+        self.path = path
+        self.source = source
+        self.batch_size = batch_size
+        self.watermark = 0
+        self.completed = set()
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, source, batch_size):
+        checkpoint = cls(path, source, batch_size)
+        try:
+            with open(path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return checkpoint
+
+        if state.get("source") != source or state.get("batch_size") != batch_size:
+            raise ImportFailed(
+                f"{path} belongs to a different file or batch size; pass --restart to start over"
+            )
+        checkpoint.watermark = state["watermark"]
+        checkpoint.completed = set(state["completed"])
+        checkpoint.rows = state["rows"]
+        return checkpoint
+
+    def is_done(self, index):
+        return index < self.watermark or index in self.completed
+
+    def commit(self, index, rows):
+        with self._lock:
+            self.completed.add(index)
+            self.rows += rows
+            while self.watermark in self.completed:
+                self.completed.remove(self.watermark)
+                self.watermark += 1
+            self._save()
+
+    def _save(self):
+        if self.path is None:
+            return
+        state = {
+            "source": self.source,
+            "batch_size": self.batch_size,
+            "watermark": self.watermark,
+            "completed": sorted(self.completed),
+            "rows": self.rows,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path is None:
+            return
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+# --- Import ---
+
+def import_csv(path, sink, batch_size=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY, checkpoint=None):
+    """Stream path into sink; returns a summary dict with rows, errors and rows_per_second."""
+    if batch_size < 1 or concurrency < 1:
+        raise ImportFailed(f"batch size and concurrency must be at least 1, got {batch_size} and {concurrency}")
+    started = time.perf_counter()
+    checkpoint = checkpoint or Checkpoint(None, None, batch_size)
+    errors = []
+    inserted = 0
+    prepared = False
+    columns = None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = {}
+
+        def drain(return_when):
+            nonlocal inserted
+            done, _ = wait(in_flight, return_when=return_when)
+            failure = None
+            for future in done:
+                index, count = in_flight.pop(future)
+                if future.exception() is not None:
+                    failure = failure or future.exception()
+                    continue
+                checkpoint.commit(index, count)
+                inserted += count
+
+            # Let the other in-flight batches land and record them before
+            # bailing out, so a resumed run does not insert them twice
+            if failure is not None:
+                if in_flight:
+                    drain(ALL_COMPLETED)
+                raise failure
+
+        for index, chunk in batches(read_rows(path), batch_size, skip=checkpoint.watermark):
+            valid, chunk_errors = coerce_chunk(chunk)
+            errors.extend(chunk_errors)
+            if checkpoint.is_done(index):
+                continue
+            if not valid:
+                checkpoint.commit(index, 0)
+                continue
+
+            if columns is None:
+                columns = list(valid[0])
+            if not prepared:
+                sink.prepare(columns)
+                prepared = True
+
+            # Bound the rows held in memory to a couple of batches per worker
+            if len(in_flight) >= concurrency * 2:
+                drain(FIRST_COMPLETED)
+            in_flight[pool.submit(sink.insert, valid, columns)] = (index, len(valid))
+
+        if in_flight:
+            drain(ALL_COMPLETED)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": inserted,
+        "total_rows": checkpoint.rows,
+        "invalid": errors,
+        "seconds": elapsed,
+        "rows_per_second": inserted / elapsed if elapsed else 0.0,
+    }
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a CSV export into imported_classes in batches")
+    parser.add_argument("csv", help="CSV file with a header row")
+    parser.add_argument("--database", help="sqlite:///path.db or postgresql://... (default: Supabase from env)")
+    parser.add_argument("--table", default=DEFAULT_TABLE)
+    parser.add_argument("--batch-size", type=_positive_int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=_positive_int, default=DEFAULT_CONCURRENCY, help="batches inserted in parallel")
+    parser.add_argument("--state", help="checkpoint file (default: <csv>.import-state.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint and import from the top")
+    args = parser.parse_args(argv)
+
+    state_path = args.state or f"{args.csv}.import-state.json"
+    try:
+        sink = open_sink(args.database, args.table)
+        source = fingerprint(args.csv)
+        if args.restart:
+            Checkpoint(state_path, source, args.batch_size).clear()
+        checkpoint = Checkpoint.load(state_path, source, args.batch_size)
+        if checkpoint.watermark:
+            print(f"Resuming after batch {checkpoint.watermark} ({checkpoint.rows} rows already imported)")
+
+        summary = import_csv(args.csv, sink, args.batch_size, args.concurrency, checkpoint)
+    except (ImportFailed, OSError) as exc:
+        print(f"✗ {exc}", file=sys.stderr)
+        return 1
+
+    for line_num, error in summary["invalid"][:20]:
+        print(f"✗ line {line_num}: {error}")
+    if len(summary["invalid"]) > 20:
+        print(f"✗ ... {len(summary['invalid']) - 20} more invalid rows")
+
+    print(
+        f"✓ Imported {summary['rows']} rows in {summary['seconds']:.2f}s "
+        f"({summary['rows_per_second']:,.0f} rows/s), {len(summary['invalid'])} invalid"
+    )
+    if summary["total_rows"] != summary["rows"]:
+        print(f"  {summary['total_rows']} rows imported in total across resumed runs")
+    checkpoint.clear()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
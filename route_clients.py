@@ -0,0 +1,250 @@
+"""Static report of Supabase and Stripe client construction in API routes.
+
+Every handler is followed through the top-level helpers it calls inside the
+same file (handler -> helper -> getter -> factory), and each client factory
+reached that way is a client built on every request. A helper that stores
+its result in a module-level `let` is treated as memoized, so nothing under
+it counts as per-request.
+"""
+
+from collections import namedtuple
+
+from route_tokenizer import IDENT, RouteSource
+
+# (imported name, module) -> (client, request scoped). Request scoped
+# factories read per-request state such as cookies and cannot be shared.
+FACTORIES = {
+    ("createClient", "@supabase/supabase-js"): ("supabase", False),
+    ("createServiceSupabase", "@/lib/supabase"): ("supabase", False),
+    ("createClient", "@/lib/supabase/server"): ("supabase", True),
+    ("createServerClient", "@supabase/ssr"): ("supabase", True),
+    ("default", "stripe"): ("stripe", False),
+}
+
+# Identifiers a shareable factory may reference besides module-scope names
+GLOBALS = frozenset(("process", "undefined", "null", "true", "false", "String", "Number"))
+
+# TypeScript operators followed by a type rather than a value
+TYPE_OPERATORS = frozenset(("as", "satisfies"))
+
+# line is 1-based; shareable means the client could live at module scope
+Construction = namedtuple("Construction", "client factory line shareable")
+
+# chain runs from the handler through each helper down to the factory call
+CallPath = namedtuple("CallPath", "chain construction")
+
+HandlerReport = namedtuple("HandlerReport", "name paths")
+
+# module_scope counts clients built once per process (module level or memoized)
+RouteReport = namedtuple("RouteReport", "path handlers module_scope")
+
+
+def imported_names(route):
+    """Map local names to (imported name, module) for every top-level import."""
+    tokens = route.tokens
+    names = {}
+    for index, token in enumerate(tokens):
+        if token.value != "import" or token.depth != 0:
+            continue
+        cursor = index + 1
+        bindings = []
+        while cursor < len(tokens) and tokens[cursor].value not in ("from", ";"):
+            current = tokens[cursor]
+            if current.kind == IDENT and current.value not in ("type", "as"):
+                if tokens[cursor - 1].value == "as":
+                    bindings[-1] = (bindings[-1][0], current.value)
+                elif current.depth == 0:
+                    bindings.append(("default", current.value))
+                else:
+                    bindings.append((current.value, current.value))
+            cursor += 1
+        if cursor + 1 < len(tokens) and tokens[cursor].value == "from":
+            module = tokens[cursor + 1].value[1:-1]
+            for imported, local in bindings:
+                names[local] = (imported, module)
+    return names
+
+
+def module_scope(route, imports):
+    """Names bound at the top level of the file."""
+    tokens = route.tokens
+    names = set(imports)
+    for index in range(1, len(tokens)):
+        token = tokens[index]
+        if token.depth == 0 and token.kind == IDENT and tokens[index - 1].value in ("const", "let", "var", "function", "class"):
+            names.add(token.value)
+    return names
+
+
+def _free_names(route, lo, hi):
+    tokens = route.tokens
+    for index in range(lo, hi):
+        token = tokens[index]
+        if token.kind != IDENT or tokens[index - 1].value in (".", "?."):
+            continue
+        # Object literal keys such as `{ apiVersion: ... }`
+        if index + 1 < len(tokens) and tokens[index + 1].value == ":" and tokens[index - 1].value in ("{", ","):
+            continue
+        # Type assertions such as `'2024-06-20' as Stripe.LatestApiVersion`
+        if token.value in TYPE_OPERATORS or tokens[index - 1].value in TYPE_OPERATORS:
+            continue
+        yield token.value
+
+
+def local_scope(route, lo, hi, scope):
+    """Consts in the range whose initializers only depend on module scope, like env lookups."""
+    names = set()
+    for decl in route.consts(lo, hi, depth=None):
+        init_lo, init_hi = route.index_at(decl.init_start), route.index_at(decl.init_end)
+        if all(name in scope or name in GLOBALS or name in names for name in _free_names(route, init_lo, init_hi)):
+            names.add(decl.name)
+    return names
+
+
+def constructions(route, lo, hi, imports, scope):
+    """Client factory calls between token indices lo and hi."""
+    tokens = route.tokens
+    source = route.source
+    found = []
+    for index in range(lo, hi - 1):
+        token = tokens[index]
+        if token.kind != IDENT or tokens[index + 1].value != "(":
+            continue
+        if index and tokens[index - 1].value in (".", "?."):
+            continue
+
+        known = FACTORIES.get(imports.get(token.value))
+        if known is None:
+            continue
+        client, request_scoped = known
+        uses_new = index > 0 and tokens[index - 1].value == "new"
+        if client == "stripe" and not uses_new:
+            continue
+
+        close = route.partners[index + 1]
+        shareable = not request_scoped and all(
+            name in scope or name in GLOBALS for name in _free_names(route, index + 2, close)
+        )
+        factory = f"new {token.value}" if uses_new else token.value
+        line = source.count("\n", 0, token.start) + 1
+        found.append(Construction(client, factory, line, shareable))
+    return found
+
+
+def _calls(route, lo, hi, callables):
+    tokens = route.tokens
+    called = []
+    for index in range(lo, hi - 1):
+        token = tokens[index]
+        if token.kind == IDENT and token.value in callables and tokens[index + 1].value == "(":
+            if not index or tokens[index - 1].value not in (".", "?.", "new", "function"):
+                called.append(token.value)
+    return called
+
+
+def memoized(route, callable, module_lets):
+    """True if the callable assigns a module-level `let`, i.e. caches its result."""
+    tokens = route.tokens
+    for index in range(callable.lo, callable.hi - 1):
+        token = tokens[index]
+        if token.kind == IDENT and token.value in module_lets and tokens[index + 1].value in ("=", "??=", "||="):
+            return True
+    return False
+
+
+def analyze_source(path, source):
+    route = RouteSource(source)
+    imports = imported_names(route)
+    scope = module_scope(route, imports)
+    tokens = route.tokens
+    module_lets = {
+        tokens[index].value
+        for index in range(1, len(tokens))
+        if tokens[index].depth == 0 and tokens[index - 1].value == "let"
+    }
+
+    callables = {c.name: c for c in route.callables()}
+    direct = {
+        name: constructions(route, c.lo, c.hi, imports, scope | local_scope(route, c.lo, c.hi, scope))
+        for name, c in callables.items()
+    }
+    calls = {name: _calls(route, c.lo, c.hi, callables) for name, c in callables.items()}
+    cached = {name for name, c in callables.items() if memoized(route, c, module_lets)}
+
+    def walk(name, chain):
+        if name in cached:
+            return []
+        paths = [CallPath(chain + (cons.factory,), cons) for cons in direct[name]]
+        for callee in calls[name]:
+            if callee not in chain:
+                paths.extend(walk(callee, chain + (callee,)))
+        return paths
+
+    # The exported GET/POST/... callables, arrow functions included, which
+    # are exactly what memoize-clients rewrites
+    handlers = [HandlerReport(handler.name, walk(handler.name, (handler.name,))) for handler in route.handlers()]
+
+    # Clients built outside any callable, or behind a memoized getter
+    shared = sum(len(direct[name]) for name in cached)
+    cursor = 0
+    for c in sorted(callables.values(), key=lambda c: c.lo):
+        shared += len(constructions(route, cursor, c.lo, imports, scope))
+        cursor = max(cursor, c.hi)
+    shared += len(constructions(route, cursor, len(tokens), imports, scope))
+
+    return RouteReport(path, handlers, shared)
+
+
+def analyze_file(path):
+    with open(path, 'r') as f:
+        return analyze_source(path, f.read())
+
+
+def report_to_dict(report):
+    return {
+        "path": report.path,
+        "module_scope": report.module_scope,
+        "handlers": [
+            {
+                "name": handler.name,
+                "per_request": len(handler.paths),
+                "paths": [
+                    {
+                        "chain": list(path.chain),
+                        "client": path.construction.client,
+                        "line": path.construction.line,
+                        "shareable": path.construction.shareable,
+                    }
+                    for path in handler.paths
+                ],
+            }
+            for handler in report.handlers
+        ],
+    }
+
+
+def print_report(reports):
+    totals = {"handlers": 0, "clients": 0, "shareable": 0}
+    for report in reports:
+        busy = [handler for handler in report.handlers if handler.paths]
+        if not busy:
+            continue
+        print(report.path)
+        for handler in busy:
+            by_client = {}
+            for path in handler.paths:
+                by_client[path.construction.client] = by_client.get(path.construction.client, 0) + 1
+            breakdown = ", ".join(f"{client} {count}" for client, count in sorted(by_client.items()))
+            print(f"  {handler.name}: {len(handler.paths)} client(s) per request ({breakdown})")
+            for path in handler.paths:
+                scope = "shareable" if path.construction.shareable else "request-scoped"
+                print(f"    {' -> '.join(path.chain)}  [{path.construction.client}, {scope}, line {path.construction.line}]")
+
+            totals["handlers"] += 1
+            totals["clients"] += len(handler.paths)
+            totals["shareable"] += sum(1 for path in handler.paths if path.construction.shareable)
+
+    print(
+        f"{totals['handlers']} handler(s) build {totals['clients']} client(s) per request; "
+        f"{totals['shareable']} could share a module-scope memoized client"
+    )
@@ -0,0 +1,357 @@
+"""Single-pass TypeScript tokenizer for the route codemods.
+
+Understands just enough of the language to find top-level ``const``
+declarations and ``export async function`` handlers without regex
+backtracking: strings, template literals, comments and regex literals are
+consumed as opaque tokens, and brackets are matched in one linear pass.
+"""
+
+import bisect
+import re
+from collections import namedtuple
+
+IDENT = "ident"
+NUMBER = "number"
+STRING = "string"
+TEMPLATE = "template"
+REGEX = "regex"
+PUNCT = "punct"
+COMMENT = "comment"
+
+# depth is the bracket nesting level the token sits at; an opening bracket
+# and its matching closing bracket share the same depth
+Token = namedtuple("Token", "kind value start end depth")
+
+# start/end are character offsets covering `const ... ;`, init holds the
+# values of the initializer tokens for cheap structural comparison and
+# init_start/init_end the offsets of the initializer text itself
+ConstDecl = namedtuple("ConstDecl", "name start end init init_start init_end")
+
+# A top-level `function NAME(...) {...}` or `const NAME = (...) => ...`;
+# lo/hi bound the body's code tokens, name_index is the token of NAME and
+# start/end are the character offsets of the whole declaration
+Callable = namedtuple("Callable", "name name_index start end lo hi")
+
+# Route handler exports Next.js dispatches requests to
+HTTP_METHODS = ("GET", "POST", "PUT", "DELETE", "PATCH")
+
+_WS = re.compile(r"\s+")
+_IDENT = re.compile(r"[A-Za-z_$][\w$]*")
+_NUMBER = re.compile(r"0[xXbBoO][\da-fA-F_]+n?|(?:\d[\d_]*\.?[\d_]*|\.\d[\d_]*)(?:[eE][+-]?\d+)?n?")
+_STRING = re.compile(r"\"(?:[^\"\\\n]|\\[\s\S])*\"|'(?:[^'\\\n]|\\[\s\S])*'")
+_LINE_COMMENT = re.compile(r"//[^\n]*")
+_BLOCK_COMMENT = re.compile(r"/\*[\s\S]*?(?:\*/|\Z)")
+_TEMPLATE_CHUNK = re.compile(r"(?:[^`\\$]|\\[\s\S]|\$(?!\{))*(`|\$\{|\Z)")
+_REGEX = re.compile(r"/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*")
+_PUNCT = re.compile(
+    r"\.\.\.|=>|\?\?=?|\?\.|[=!]==?|\+\+|--|&&=?|\|\|=?|\*\*=?|[<>]=?|[-+*/%&|^]=?|[{}()\[\];,.:?~@#]"
+)
+_UNTERMINATED = re.compile(r"[^\n]*")
+
+# Keywords that start a new statement when they open a line, which ends a
+# semicolon-less declaration through automatic semicolon insertion
+_STATEMENT_STARTS = frozenset(
+    "const let var function async export import return if for while try throw type interface class".split()
+)
+
+_OPENERS = "({["
+_CLOSERS = ")}]"
+
+# Keywords after which a `/` starts a regex literal rather than a division
+_REGEX_KEYWORDS = frozenset(
+    "return typeof instanceof in of new delete void throw case do else yield await".split()
+)
+
+
+def _regex_allowed(prev):
+    if prev is None:
+        return True
+    if prev.kind == IDENT:
+        return prev.value in _REGEX_KEYWORDS
+    if prev.kind == PUNCT:
+        return prev.value not in (")", "]", "++", "--")
+    if prev.kind == TEMPLATE:
+        return prev.value.endswith("${")
+    return False
+
+
+def tokenize(source, comments=True):
+    """Split TypeScript source into tokens in a single left-to-right pass."""
+    tokens = []
+    append = tokens.append
+    pos = 0
+    n = len(source)
+    depth = 0
+    prev = None
+    # depth at which each open template `${` expression started
+    template_depths = []
+
+    while pos < n:
+        ch = source[pos]
+
+        if ch.isspace():
+            pos = _WS.match(source, pos).end()
+            continue
+
+        if ch == "/" and source.startswith("//", pos):
+            end = _LINE_COMMENT.match(source, pos).end()
+            if comments:
+                append(Token(COMMENT, source[pos:end], pos, end, depth))
+            pos = end
+            continue
+
+        if ch == "/" and source.startswith("/*", pos):
+            end = _BLOCK_COMMENT.match(source, pos).end()
+            if comments:
+                append(Token(COMMENT, source[pos:end], pos, end, depth))
+            pos = end
+            continue
+
+        if ch == "`" or (ch == "}" and template_depths and template_depths[-1] == depth):
+            if ch == "}":
+                template_depths.pop()
+            m = _TEMPLATE_CHUNK.match(source, pos + 1)
+            if m.group(1) == "${":
+                template_depths.append(depth)
+            token = Token(TEMPLATE, source[pos:m.end()], pos, m.end(), depth)
+        elif ch == "'" or ch == '"':
+            m = _STRING.match(source, pos) or _UNTERMINATED.match(source, pos)
+            token = Token(STRING, m.group(), pos, m.end(), depth)
+        elif ch.isalpha() or ch in "_$":
+            m = _IDENT.match(source, pos)
+            token = Token(IDENT, m.group(), pos, m.end(), depth)
+        elif ch.isdigit() or (ch == "." and source[pos + 1:pos + 2].isdigit()):
+            m = _NUMBER.match(source, pos)
+            token = Token(NUMBER, m.group(), pos, m.end(), depth)
+        elif ch == "/" and _regex_allowed(prev) and _REGEX.match(source, pos):
+            m = _REGEX.match(source, pos)
+            token = Token(REGEX, m.group(), pos, m.end(), depth)
+        else:
+            m = _PUNCT.match(source, pos)
+            end = m.end() if m else pos + 1
+            value = source[pos:end]
+            if value in _OPENERS:
+                token = Token(PUNCT, value, pos, end, depth)
+                depth += 1
+            elif value in _CLOSERS:
+                depth = max(depth - 1, 0)
+                token = Token(PUNCT, value, pos, end, depth)
+            else:
+                token = Token(PUNCT, value, pos, end, depth)
+
+        append(token)
+        prev = token
+        pos = token.end
+
+    return tokens
+
+
+def match_brackets(tokens):
+    """Map every bracket token index to the index of its partner (-1 if unbalanced)."""
+    partners = [-1] * len(tokens)
+    stack = []
+    for index, token in enumerate(tokens):
+        if token.kind != PUNCT:
+            continue
+        if token.value in _OPENERS:
+            stack.append(index)
+        elif token.value in _CLOSERS and stack:
+            opener = stack.pop()
+            partners[opener] = index
+            partners[index] = opener
+    return partners
+
+
+class RouteSource:
+    """Tokenized view of a route file with lookups for declarations and handlers."""
+
+    def __init__(self, source):
+        self.source = source
+        self.tokens = tokenize(source, comments=False)
+        self.partners = match_brackets(self.tokens)
+        self._starts = None
+
+    def index_at(self, offset):
+        """Index of the first token starting at or after offset."""
+        if self._starts is None:
+            self._starts = [token.start for token in self.tokens]
+        return bisect.bisect_left(self._starts, offset)
+
+    def _starts_statement(self, index, depth):
+        """True if the token at index begins a new statement at depth (ASI)."""
+        token = self.tokens[index]
+        if token.depth != depth or token.value not in _STATEMENT_STARTS or index == 0:
+            return False
+        return "\n" in self.source[self.tokens[index - 1].end:token.start]
+
+    def starts_statement(self, index):
+        """True if the token at index begins a top-level statement, after a `;` or by ASI."""
+        return index == 0 or self.tokens[index - 1].value == ";" or self._starts_statement(index, 0)
+
+    def consts(self, lo=0, hi=None, depth=0):
+        """Return `const` declarations between token indices lo and hi.
+
+        Only declarations at the given bracket depth are returned, or at
+        any depth when depth is None.
+        """
+        tokens = self.tokens
+        hi = len(tokens) if hi is None else hi
+        decls = []
+        index = lo
+        while index < hi:
+            token = tokens[index]
+            if (
+                token.kind != IDENT
+                or token.value != "const"
+                or (depth is not None and token.depth != depth)
+                or index + 2 >= hi
+                or tokens[index + 1].kind != IDENT
+            ):
+                index += 1
+                continue
+
+            name = tokens[index + 1].value
+            cursor = index + 2
+            # Skip a type annotation up to the `=` at the declaration's depth
+            while cursor < hi and not (tokens[cursor].value == "=" and tokens[cursor].depth == token.depth):
+                if tokens[cursor].value == ";" or tokens[cursor].depth < token.depth:
+                    break
+                cursor = self.partners[cursor] + 1 if self.partners[cursor] > cursor else cursor + 1
+            if cursor >= hi or tokens[cursor].value != "=":
+                index += 1
+                continue
+
+            init_lo = cursor + 1
+            cursor = init_lo
+            while cursor < hi and tokens[cursor].depth >= token.depth:
+                if tokens[cursor].value == ";" and tokens[cursor].depth == token.depth:
+                    break
+                if cursor > init_lo and self._starts_statement(cursor, token.depth):
+                    break
+                cursor = self.partners[cursor] + 1 if self.partners[cursor] > cursor else cursor + 1
+            cursor = min(cursor, hi)
+
+            init = tuple(t.value for t in tokens[init_lo:cursor])
+            init_end = tokens[cursor - 1].end
+            if cursor < hi and tokens[cursor].value == ";":
+                end = tokens[cursor].end
+                cursor += 1
+            else:
+                end = init_end
+            init_start = tokens[init_lo].start if init_lo < cursor else init_end
+            decls.append(ConstDecl(name, token.start, end, init, init_start, init_end))
+            index = cursor
+        return decls
+
+    def handlers(self, names=HTTP_METHODS):
+        """Return the exported callables named in names, in either shape.
+
+        That is `export [async] function GET(...) {...}` as well as
+        `export const GET = async (...) => {...}`.
+        """
+        tokens = self.tokens
+        return [
+            function for function in self.callables()
+            if function.name in names and tokens[self.index_at(function.start)].value == "export"
+        ]
+
+    def _skip_to(self, cursor, values):
+        """Advance to the next token in values, stepping over bracketed groups."""
+        tokens = self.tokens
+        while cursor < len(tokens) and tokens[cursor].value not in values:
+            if self.partners[cursor] > cursor:
+                cursor = self.partners[cursor]
+            cursor += 1
+        return cursor
+
+    def statement_end(self, cursor):
+        """Index of the `;` or next statement that ends a top-level expression."""
+        tokens = self.tokens
+        start = cursor
+        while cursor < len(tokens):
+            if tokens[cursor].value == ";" and tokens[cursor].depth == 0:
+                break
+            if cursor > start and self._starts_statement(cursor, 0):
+                break
+            if self.partners[cursor] > cursor:
+                cursor = self.partners[cursor]
+            cursor += 1
+        return cursor
+
+    def callables(self):
+        """Return top-level function declarations and arrow-function consts."""
+        tokens = self.tokens
+        count = len(tokens)
+        found = []
+        for index, token in enumerate(tokens):
+            if token.depth != 0 or token.kind != IDENT or index + 2 >= count:
+                continue
+            start = tokens[index - 1].start if index and tokens[index - 1].value == "export" else token.start
+            if index and tokens[index - 1].value == "async":
+                start = tokens[index - 1].start
+                if index > 1 and tokens[index - 2].value == "export":
+                    start = tokens[index - 2].start
+
+            if token.value == "function" and tokens[index + 1].kind == IDENT:
+                cursor = index + 2
+                if tokens[cursor].value != "(" or self.partners[cursor] < 0:
+                    continue
+                cursor = self._skip_to(self.partners[cursor] + 1, ("{", ";"))
+                if cursor >= count or tokens[cursor].value != "{" or self.partners[cursor] < 0:
+                    continue
+                close = self.partners[cursor]
+                found.append(Callable(tokens[index + 1].value, index + 1, start, tokens[close].end, cursor + 1, close))
+
+            elif token.value == "const" and tokens[index + 1].kind == IDENT and tokens[index + 2].value == "=":
+                cursor = index + 3
+                if cursor < count and tokens[cursor].value == "async":
+                    cursor += 1
+                if cursor >= count:
+                    continue
+                if tokens[cursor].value == "(" and self.partners[cursor] > cursor:
+                    cursor = self.partners[cursor] + 1
+                elif tokens[cursor].kind == IDENT:
+                    cursor += 1
+                else:
+                    continue
+                # Step over a return type annotation up to the arrow
+                cursor = self._skip_to(cursor, ("=>", ";", "{"))
+                if cursor >= count or tokens[cursor].value != "=>":
+                    continue
+
+                body = cursor + 1
+                if body < count and tokens[body].value == "{" and self.partners[body] > body:
+                    lo, hi = body + 1, self.partners[body]
+                    last = hi + 1 if hi + 1 < count and tokens[hi + 1].value == ";" else hi
+                else:
+                    lo, hi = body, self.statement_end(body)
+                    last = hi if hi < count and tokens[hi].value == ";" else hi - 1
+                end = tokens[last].end
+                found.append(Callable(tokens[index + 1].value, index + 1, start, end, lo, hi))
+        return found
+
+    def defines(self, name):
+        """True if a top-level `const` or `function` declares `name`."""
+        tokens = self.tokens
+        for index in range(1, len(tokens)):
+            token = tokens[index]
+            if token.value == name and token.depth == 0 and token.kind == IDENT:
+                if tokens[index - 1].value in ("const", "function", "let"):
+                    return True
+        return False
+
+    def references(self, name, lo=0, hi=None):
+        """True if `name` is used as a bare identifier (not a property) in the range."""
+        tokens = self.tokens
+        hi = len(tokens) if hi is None else hi
+        for index in range(lo, hi):
+            token = tokens[index]
+            if token.kind != IDENT or token.value != name:
+                continue
+            if index and tokens[index - 1].value in (".", "?."):
+                continue
+            # Object literal keys such as `{ supabase: 1 }`
+            if index and index + 1 < len(tokens) and tokens[index + 1].value == ":" and tokens[index - 1].value in ("{", ","):
+                continue
+            return True
+        return False
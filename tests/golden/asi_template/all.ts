@@ -0,0 +1,37 @@
+import { NextResponse } from 'next/server'
+import { createServiceSupabase } from '@/lib/supabase';
+
+// Initialize Supabase client only when needed
+function createSupabaseClient() {
+  return createServiceSupabase();
+}
+
+let _supabaseInstance: ReturnType<typeof createSupabaseClient> | null = null;
+
+// Reuse one client across requests instead of building one per call
+const getSupabase = () => {
+  if (!_supabaseInstance) {
+    _supabaseInstance = createSupabaseClient();
+  }
+  return _supabaseInstance;
+};
+
+const banner = `const supabase = createClient(${'}'}) { ${`nested ${'`'}`} }`
+const braces = /[{}]+/g
+
+export async function GET(request: Request) {
+  const supabase = getSupabase();
+  const label = `${request.method} ${banner.replace(braces, '')} {`
+  const { data } = await supabase
+    .from('classes')
+    .select('*')
+  return NextResponse.json({ label, data })
+}
+
+export async function DELETE(request: Request) {
+  const supabase = getSupabase();
+  const { id } = await request.json()
+  const query = `/* ${id} */ // }`
+  await supabase.from('classes').delete().eq('id', id)
+  return NextResponse.json({ query })
+}
@@ -0,0 +1,25 @@
+import { NextResponse } from 'next/server'
+import { createClient } from '@supabase/supabase-js'
+
+// Initialize Supabase client
+const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!
+const supabaseServiceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY!
+const supabase = createClient(supabaseUrl, supabaseServiceRoleKey)
+
+const banner = `const supabase = createClient(${'}'}) { ${`nested ${'`'}`} }`
+const braces = /[{}]+/g
+
+export async function GET(request: Request) {
+  const label = `${request.method} ${banner.replace(braces, '')} {`
+  const { data } = await supabase
+    .from('classes')
+    .select('*')
+  return NextResponse.json({ label, data })
+}
+
+export async function DELETE(request: Request) {
+  const { id } = await request.json()
+  const query = `/* ${id} */ // }`
+  await supabase.from('classes').delete().eq('id', id)
+  return NextResponse.json({ query })
+}
@@ -0,0 +1,22 @@
+import { NextResponse } from 'next/server'
+import { createServiceSupabase } from '@/lib/supabase';
+
+const banner = `const supabase = createClient(${'}'}) { ${`nested ${'`'}`} }`
+const braces = /[{}]+/g
+
+export async function GET(request: Request) {
+  const supabase = createServiceSupabase();
+  const label = `${request.method} ${banner.replace(braces, '')} {`
+  const { data } = await supabase
+    .from('classes')
+    .select('*')
+  return NextResponse.json({ label, data })
+}
+
+export async function DELETE(request: Request) {
+  const supabase = createServiceSupabase();
+  const { id } = await request.json()
+  const query = `/* ${id} */ // }`
+  await supabase.from('classes').delete().eq('id', id)
+  return NextResponse.json({ query })
+}
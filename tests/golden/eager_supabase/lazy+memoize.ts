@@ -0,0 +1,52 @@
+import { NextResponse } from 'next/server';
+import { createClient } from '@supabase/supabase-js';
+
+export const dynamic = 'force-dynamic';
+
+// Lazy initialization to avoid build-time evaluation
+const createSupabaseClient = () => {
+  const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
+  const supabaseServiceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY!;
+  return createClient(supabaseUrl, supabaseServiceRoleKey);
+};
+
+let _supabaseInstance: ReturnType<typeof createSupabaseClient> | null = null;
+
+// Reuse one client across requests instead of building one per call
+const getSupabase = () => {
+  if (!_supabaseInstance) {
+    _supabaseInstance = createSupabaseClient();
+  }
+  return _supabaseInstance;
+};
+
+async function loadStudio(id: string) {
+  const supabase = getSupabase();
+  const { data, error } = await supabase.from('studios').select('*').eq('id', id).single();
+  if (error) throw error;
+  return data;
+}
+
+export async function GET(request: Request) {
+  try {
+    const supabase = getSupabase();
+    const { searchParams } = new URL(request.url);
+    const studio = await loadStudio(searchParams.get('id') ?? '');
+    const { data } = await supabase.from('classes').select('*').eq('studio_id', studio.id);
+    return NextResponse.json({ studio, classes: data });
+  } catch (error: any) {
+    return NextResponse.json({ error: error.message }, { status: 500 });
+  }
+}
+
+export async function POST(request: Request) {
+  const supabase = getSupabase();
+  const body = await request.json();
+  const { error } = await supabase.from('classes').insert(body);
+  return NextResponse.json({ ok: !error });
+}
+
+export async function OPTIONS() {
+  // Only mentions the client as an object key
+  return NextResponse.json({ supabase: 'ok' });
+}
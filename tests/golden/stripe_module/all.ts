@@ -0,0 +1,60 @@
+import { NextResponse } from 'next/server';
+import { createServiceSupabase } from '@/lib/supabase';
+import Stripe from 'stripe';
+
+export const dynamic = 'force-dynamic';
+
+// Initialize Supabase client only when needed
+function createSupabaseClient() {
+  return createServiceSupabase();
+}
+
+let _supabaseInstance: ReturnType<typeof createSupabaseClient> | null = null;
+
+// Reuse one client across requests instead of building one per call
+const getSupabase = () => {
+  if (!_supabaseInstance) {
+    _supabaseInstance = createSupabaseClient();
+  }
+  return _supabaseInstance;
+};
+
+// Initialize Stripe client only when needed
+function createStripeClient() {
+  return new Stripe(process.env.STRIPE_SECRET_KEY!, {
+    apiVersion: '2024-06-20' as Stripe.LatestApiVersion,
+  });
+}
+
+let _stripeInstance: ReturnType<typeof createStripeClient> | null = null;
+
+// Reuse one client across requests instead of building one per call
+const getStripe = () => {
+  if (!_stripeInstance) {
+    _stripeInstance = createStripeClient();
+  }
+  return _stripeInstance;
+};
+
+export async function POST(request: Request) {
+  try {
+    const stripe = getStripe();
+    const supabase = getSupabase();
+    const { accountId, amount } = await request.json();
+    const transfer = await stripe.transfers.create({
+      amount,
+      currency: 'usd',
+      destination: accountId,
+    });
+    await supabase.from('payout_history').insert({ transfer_id: transfer.id, amount });
+    return NextResponse.json({ transfer });
+  } catch (error: any) {
+    return NextResponse.json({ error: error.message }, { status: 500 });
+  }
+}
+
+export async function GET() {
+  const stripe = getStripe();
+  const balance = await stripe.balance.retrieve();
+  return NextResponse.json({ available: balance.available });
+}
@@ -0,0 +1,35 @@
+import { NextResponse } from 'next/server';
+import Stripe from 'stripe';
+import { createClient } from '@supabase/supabase-js';
+
+export const dynamic = 'force-dynamic';
+
+// Initialize Supabase client
+const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
+const supabaseServiceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY!;
+const supabase = createClient(supabaseUrl, supabaseServiceRoleKey);
+
+// Initialize Stripe
+const stripe = new Stripe(process.env.STRIPE_SECRET_KEY!, {
+  apiVersion: '2024-06-20' as Stripe.LatestApiVersion,
+});
+
+export async function POST(request: Request) {
+  try {
+    const { accountId, amount } = await request.json();
+    const transfer = await stripe.transfers.create({
+      amount,
+      currency: 'usd',
+      destination: accountId,
+    });
+    await supabase.from('payout_history').insert({ transfer_id: transfer.id, amount });
+    return NextResponse.json({ transfer });
+  } catch (error: any) {
+    return NextResponse.json({ error: error.message }, { status: 500 });
+  }
+}
+
+export async function GET() {
+  const balance = await stripe.balance.retrieve();
+  return NextResponse.json({ available: balance.available });
+}
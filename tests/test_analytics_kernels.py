@@ -0,0 +1,39 @@
+import tracemalloc
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from analytics_kernels import CHUNK_SIZE, open_series, percentile, summarize, write_series
+
+
+@pytest.mark.parametrize("p", [0, 1, 50, 95, 99.9, 100])
+def test_percentile_selects_the_ranks_of_the_sorted_series(p):
+    rng = np.random.default_rng(7)
+    values = np.round(rng.normal(0, 100, 5001) / 25).astype(np.float32)  # plenty of ties
+    values[[3, 40]] = np.nan
+    values[[5, 6]] = np.inf, -np.inf
+
+    # Interpolating next to inf or NaN is NaN on both sides
+    expected = percentile(np.sort(values), p, presorted=True)
+    assert np.array_equal(percentile(values, p), expected, equal_nan=True)
+
+
+def test_percentile_sorts_nan_last():
+    assert percentile(np.array([np.nan, 3, 1, 2], dtype=np.float32), 50) == 2.5
+
+
+def test_memory_mapped_percentiles_are_not_copied(tmp_path):
+    path = tmp_path / "revenue.f32"
+    write_series(path, np.random.default_rng(0).gamma(2.0, 60.0, 64 * CHUNK_SIZE))
+    values = open_series(str(path))
+
+    tracemalloc.start()
+    try:
+        summary = summarize(values, percentiles=(50, 95))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert peak < values.nbytes / 4
+    assert summary["p95"] == percentile(np.sort(np.array(values)), 95, presorted=True)
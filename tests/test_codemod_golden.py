@@ -0,0 +1,50 @@
+"""Golden-file tests for the route codemod rules.
+
+Each tests/golden/<case>/input.ts is rewritten with every rule combination
+below and compared with tests/golden/<case>/<combination>.ts. After an
+intended rule change, regenerate the expected files and review the diff:
+
+    UPDATE_GOLDEN=1 python -m pytest tests/test_codemod_golden.py
+"""
+
+import os
+
+import pytest
+
+from fix_remaining_routes import rewrite
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+combinations = {
+    "lazy": ["supabase-lazy-init"],
+    "service": ["supabase-service-client"],
+    "stripe": ["stripe-lazy-init"],
+    "memoize": ["memoize-clients"],
+    "lazy+stripe": ["supabase-lazy-init", "stripe-lazy-init"],
+    "lazy+memoize": ["supabase-lazy-init", "memoize-clients"],
+    "service+memoize": ["supabase-service-client", "memoize-clients"],
+    "all": ["supabase-lazy-init", "supabase-service-client", "stripe-lazy-init", "memoize-clients"],
+}
+
+cases = sorted(os.listdir(GOLDEN))
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("combination", combinations)
+@pytest.mark.parametrize("case", cases)
+def test_golden(case, combination):
+    source = read(os.path.join(GOLDEN, case, "input.ts"))
+    expected_path = os.path.join(GOLDEN, case, f"{combination}.ts")
+    result = rewrite(source, combinations[combination])
+
+    if os.environ.get("UPDATE_GOLDEN"):
+        with open(expected_path, "w") as f:
+            f.write(result)
+
+    assert result == read(expected_path)
+    # A second run over its own output must be a no-op
+    assert rewrite(result, combinations[combination]) == result
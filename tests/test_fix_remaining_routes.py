@@ -0,0 +1,267 @@
+import json
+import os
+
+import pytest
+
+import fix_remaining_routes
+from fix_remaining_routes import rewrite
+
+EAGER = """import { NextResponse } from 'next/server';
+import { createClient } from '@supabase/supabase-js';
+
+// Initialize Supabase client
+const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
+const supabaseServiceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY!;
+const supabase = createClient(supabaseUrl, supabaseServiceRoleKey);
+"""
+
+
+def test_lazy_init_wires_helpers_that_use_the_client():
+    source = EAGER + """
+async function load() {
+  return supabase.from('x').select('*');
+}
+
+export async function GET() {
+  const { data } = await load();
+  return NextResponse.json({ data });
+}
+"""
+    result = rewrite(source)
+
+    assert "const supabase = createClient" not in result
+    assert "async function load() {\n  const supabase = getSupabase();\n  return supabase" in result
+    assert "export async function GET() {\n  const { data }" in result
+
+
+def test_lazy_init_leaves_files_it_cannot_wire_alone(tmp_path):
+    source = EAGER + """
+const load = () => supabase.from('x').select('*');
+
+export async function GET() {
+  return NextResponse.json(await load());
+}
+"""
+    assert rewrite(source) == source
+
+    path = tmp_path / "route.ts"
+    path.write_text(source)
+    assert fix_remaining_routes.fix_file(str(path)).status == fix_remaining_routes.NOT_MATCHED
+    assert path.read_text() == source
+
+
+def test_stripe_lazy_init_leaves_unwireable_uses_alone():
+    source = """import Stripe from 'stripe';
+
+const stripe = new Stripe(process.env.STRIPE_SECRET_KEY!);
+export const balance = () => stripe.balance.retrieve();
+"""
+    assert rewrite(source, ["stripe-lazy-init"]) == source
+
+
+def test_object_keys_do_not_wire_a_client():
+    source = EAGER + """
+export async function GET() {
+  return NextResponse.json({ supabase: 1 });
+}
+"""
+    result = rewrite(source)
+
+    assert "getSupabase();" not in result
+
+
+def test_memoize_hoists_clients_built_in_helpers():
+    source = """import { NextResponse } from 'next/server';
+import { createServiceSupabase } from '@/lib/supabase';
+
+const resolveCategoryId = async (name: string) => {
+  const supabase = createServiceSupabase();
+  return supabase.from('categories').select('id').eq('name', name);
+};
+
+export async function POST(request: Request) {
+  const supabase = createServiceSupabase();
+  await resolveCategoryId('x');
+  return NextResponse.json(await supabase.from('classes').select('*'));
+}
+"""
+    result = rewrite(source, ["memoize-clients"])
+
+    assert result.count("createServiceSupabase()") == 1
+    assert result.count("const supabase = getSupabase();") == 2
+    assert rewrite(result, ["memoize-clients"]) == result
+
+
+def test_cache_rehashes_files_changed_in_the_tick_it_was_written(tmp_path):
+    path = tmp_path / "route.ts"
+    cache_path = str(tmp_path / "cache.json")
+    enabled = ["supabase-lazy-init"]
+    handler = "\nexport async function GET() {\n  return supabase.from('x');\n}\n"
+    # Same size, but only the second one matches the rule
+    path.write_text(EAGER.replace("_ROLE_KEY!;\nconst supabase", "_ROLE_KEX!;\nconst supabase") + handler)
+    tick = path.stat().st_mtime_ns
+
+    cache = {}
+    assert fix_remaining_routes.run([str(path)], workers=1, cache=cache, enabled=enabled) == [
+        (str(path), fix_remaining_routes.NOT_MATCHED),
+    ]
+    fix_remaining_routes.save_cache(cache, enabled, cache_path)
+    os.utime(cache_path, ns=(tick, tick))
+
+    path.write_text(EAGER + handler)
+    os.utime(path, ns=(tick, tick))
+
+    cache = fix_remaining_routes.load_cache(enabled, cache_path)
+    assert fix_remaining_routes.run([str(path)], workers=1, cache=cache, enabled=enabled) == [
+        (str(path), fix_remaining_routes.CHANGED),
+    ]
+    assert "getSupabase" in path.read_text()
+
+
+def test_dry_run_keeps_diffs_and_profile_apart(tmp_path, capsys):
+    path = tmp_path / "route.ts"
+    path.write_text(EAGER + "\nexport async function GET() {\n  return supabase.from('x');\n}\n")
+    before = path.read_text()
+
+    with pytest.raises(SystemExit):
+        fix_remaining_routes.main(["--dry-run", "--profile", "-", "--no-cache", str(path)])
+
+    profile = tmp_path / "profile.jsonl"
+    fix_remaining_routes.main(["--dry-run", "--profile", str(profile), "--no-cache", str(path)])
+
+    out = capsys.readouterr().out
+    assert out.startswith(f"--- a/{path}\n+++ b/{path}\n")
+    assert path.read_text() == before
+    records = [json.loads(line) for line in profile.read_text().splitlines()]
+    assert {record["event"] for record in records} == {"pattern", "rule", "file"}
+    assert {"module", "GET"} <= {record.get("pattern") for record in records}
+
+
+def test_service_client_keeps_semicolon_free_imports():
+    source = EAGER.replace(";\n", "\n") + "\nexport async function GET() {\n  return supabase.from('x')\n}\n"
+    result = rewrite(source, ["supabase-service-client"])
+
+    assert result.startswith(
+        "import { NextResponse } from 'next/server'\nimport { createServiceSupabase } from '@/lib/supabase';\n"
+    )
+    assert "export async function GET() {\n  const supabase = createServiceSupabase();" in result
+
+
+def test_type_assertions_do_not_make_a_client_request_scoped():
+    source = """import Stripe from 'stripe';
+
+function getStripe() {
+  return new Stripe(process.env.STRIPE_SECRET_KEY!, {
+    apiVersion: '2024-06-20' as Stripe.LatestApiVersion,
+  });
+}
+
+export async function GET() {
+  const stripe = getStripe();
+  return stripe.balance.retrieve();
+}
+"""
+    result = rewrite(source, ["memoize-clients"])
+
+    assert "function createStripeClient() {" in result
+    assert "_stripeInstance = createStripeClient();" in result
+
+
+def test_cache_skips_unchanged_files_without_reading_or_writing(tmp_path, monkeypatch):
+    path = tmp_path / "route.ts"
+    cache_path = str(tmp_path / "cache.json")
+    enabled = ["supabase-lazy-init"]
+    path.write_text(EAGER + "\nexport async function GET() {\n  return supabase.from('x');\n}\n")
+
+    cache = {}
+    fix_remaining_routes.run([str(path)], workers=1, cache=cache, enabled=enabled)
+    # Make the rewritten file clearly older than the cache written after it
+    past = path.stat().st_mtime_ns - 10**9
+    os.utime(path, ns=(past, past))
+    cache[str(path)]["mtime_ns"] = past
+    fix_remaining_routes.save_cache(cache, enabled, cache_path)
+
+    def no_open(*args, **kwargs):
+        raise AssertionError("unchanged file was opened")
+
+    cache = fix_remaining_routes.load_cache(enabled, cache_path)
+    monkeypatch.setattr(fix_remaining_routes, "open", no_open, raising=False)
+    results = fix_remaining_routes.run([str(path)], workers=1, cache=cache, enabled=enabled)
+
+    assert results == [(str(path), fix_remaining_routes.ALREADY_FIXED)]
+    assert path.stat().st_mtime_ns == past
+
+
+def test_lazy_init_wires_handlers_that_shadow_the_client_in_a_nested_block():
+    source = EAGER + """
+export async function GET() {
+  const { data } = await supabase.from('a').select('*');
+  if (data) {
+    const supabase = 1;
+  }
+  return NextResponse.json({ data });
+}
+"""
+    result = rewrite(source)
+
+    assert "export async function GET() {\n  const supabase = getSupabase();\n  const { data }" in result
+    assert "    const supabase = 1;" in result
+
+
+@pytest.mark.parametrize("existing", [
+    "import { createServiceSupabase, other } from '@/lib/supabase';",
+    'import { createServiceSupabase } from "@/lib/supabase";',
+    "import { createServiceSupabase } from '@/lib/supabase'",
+])
+def test_service_client_reuses_an_existing_import(existing):
+    source = EAGER.replace(
+        "import { createClient }", existing + "\nimport { createClient }"
+    ) + "\nexport async function GET() {\n  return supabase.from('x');\n}\n"
+    result = rewrite(source, ["supabase-service-client"])
+
+    assert result.count("createServiceSupabase }") + result.count("createServiceSupabase, other }") == 1
+    assert existing in result
+    assert "\n\n\n" not in result
+
+
+def test_profile_on_stdout_stays_json_lines(tmp_path, capsys):
+    path = tmp_path / "route.ts"
+    path.write_text(EAGER + "\nexport async function GET() {\n  return supabase.from('x');\n}\n")
+
+    fix_remaining_routes.main(["--profile", "-", "--no-cache", str(path)])
+
+    captured = capsys.readouterr()
+    records = [json.loads(line) for line in captured.out.splitlines()]
+    assert {"pattern", "rule", "file"} == {record["event"] for record in records}
+    assert f"✓ changed: {path}" in captured.err
+    assert "Done!" in captured.err
+
+
+def test_lazy_init_collapses_inline_setup_in_arrow_handlers():
+    source = """import { NextResponse } from 'next/server';
+import { createClient } from '@supabase/supabase-js';
+
+export const POST = async (request: Request) => {
+  const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
+  const supabaseServiceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY!;
+  const supabase = createClient(supabaseUrl, supabaseServiceRoleKey);
+  return NextResponse.json(await supabase.from('x').select('*'));
+};
+"""
+    result = rewrite(source)
+
+    assert "export const POST = async (request: Request) => {\n  const supabase = getSupabase();\n  return" in result
+    assert "const getSupabase = () => {" in result
+    assert rewrite(result) == result
+
+
+def test_editing_the_rules_invalidates_the_cache(tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "cache.json")
+    enabled = ["supabase-lazy-init"]
+    entry = {"hash": "x", "mtime_ns": 1, "size": 1, "status": fix_remaining_routes.ALREADY_FIXED}
+    fix_remaining_routes.save_cache({"route.ts": entry}, enabled, cache_path)
+
+    assert fix_remaining_routes.load_cache(enabled, cache_path) == {"route.ts": entry}
+
+    monkeypatch.setattr(fix_remaining_routes, "rules_hash", lambda: "edited")
+    assert fix_remaining_routes.load_cache(enabled, cache_path) == {}
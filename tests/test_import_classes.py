@@ -0,0 +1,178 @@
+import csv
+import sqlite3
+
+import pytest
+
+import import_classes
+from import_classes import Checkpoint, ImportFailed, SQLiteSink, coerce_row, fingerprint, import_csv
+
+
+def write_csv(path, rows, header=("name", "price", "duration")):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def table_rows(db_path, table="imported_classes"):
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute(f'SELECT name, price, duration FROM "{table}" ORDER BY rowid').fetchall()
+
+
+class FailingSink(SQLiteSink):
+    """Fails every insert whose first row is named in fail_on."""
+
+    def __init__(self, table, path, fail_on):
+        super().__init__(table, path)
+        self.fail_on = set(fail_on)
+
+    def insert(self, rows, columns):
+        if rows[0]["name"] in self.fail_on:
+            raise ImportFailed(f"boom at {rows[0]['name']}")
+        super().insert(rows, columns)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "classes.db")
+
+
+def test_batches_every_row_once(tmp_path, db):
+    path = write_csv(tmp_path / "export.csv", [(f"class-{i}", "10", "60") for i in range(23)])
+    batches = []
+
+    class Recording(SQLiteSink):
+        def insert(self, rows, columns):
+            batches.append(len(rows))
+            super().insert(rows, columns)
+
+    summary = import_csv(path, Recording("imported_classes", db), batch_size=5, concurrency=3)
+
+    assert summary["rows"] == 23
+    assert sorted(batches) == [3, 5, 5, 5, 5]
+    assert sorted(name for name, _, _ in table_rows(db)) == sorted(f"class-{i}" for i in range(23))
+
+
+def test_invalid_rows_are_reported_by_line(tmp_path, db):
+    path = write_csv(tmp_path / "export.csv", [
+        ("ok-1", "$1,234.50", "60"),
+        ("", "10", "60"),
+        ("bad-price", "ten", "60"),
+        ("ok-2", "9.99", ""),
+        ("infinite", "Infinity", "60"),
+        ("nan", "nan", "60"),
+        ("overflow", "10", "inf"),
+        ("fraction", "10", "1.7"),
+        ("huge", "1e400", "60"),
+    ])
+
+    summary = import_csv(path, SQLiteSink("imported_classes", db), batch_size=4)
+
+    assert table_rows(db) == [("ok-1", 1234.5, 60), ("ok-2", 9.99, None)]
+    assert [line for line, _ in summary["invalid"]] == [3, 4, 6, 7, 8, 9, 10]
+    assert summary["invalid"][0][1] == "name is required"
+    assert summary["invalid"][3][1].startswith("price: not a finite number")
+
+
+@pytest.mark.parametrize("row, message", [
+    ({"name": "a", "price": "-Infinity"}, "price: not a finite number"),
+    ({"name": "a", "duration": "NaN"}, "duration: not a finite number"),
+    ({"name": "a", "max_participants": "2.5"}, "max_participants: not a whole number"),
+    ({"name": "a", "price": "1e400"}, "price: out of range"),
+])
+def test_coerce_row_rejects_unusable_numbers(row, message):
+    with pytest.raises(ValueError, match=message):
+        coerce_row(row)
+
+
+def test_coerce_row_accepts_whole_decimals():
+    assert coerce_row({"name": "a", "duration": "45.0", "price": "12"}) == {"name": "a", "duration": 45, "price": 12.0}
+
+
+def test_resume_after_failed_batch_inserts_nothing_twice(tmp_path, db):
+    rows = [(f"class-{i}", "10", "60") for i in range(40)]
+    path = write_csv(tmp_path / "export.csv", rows)
+    state = str(tmp_path / "state.json")
+    source = fingerprint(path)
+
+    # Batch 3 fails while later batches are already in flight and commit
+    with pytest.raises(ImportFailed):
+        import_csv(
+            path, FailingSink("imported_classes", db, {"class-15"}),
+            batch_size=5, concurrency=4, checkpoint=Checkpoint(state, source, 5),
+        )
+    interrupted = Checkpoint.load(state, source, 5)
+    assert interrupted.watermark == 3
+    assert 3 not in interrupted.completed
+    assert interrupted.rows == len(table_rows(db))
+    already = interrupted.rows
+
+    summary = import_csv(path, SQLiteSink("imported_classes", db), batch_size=5, concurrency=4, checkpoint=interrupted)
+
+    names = [name for name, _, _ in table_rows(db)]
+    assert sorted(names) == sorted(name for name, _, _ in rows)
+    assert summary["rows"] == 40 - already
+    assert summary["total_rows"] == 40
+
+
+def test_resume_skips_out_of_order_completed_batches(tmp_path, db):
+    rows = [(f"class-{i}", "10", "60") for i in range(20)]
+    path = write_csv(tmp_path / "export.csv", rows)
+    state = str(tmp_path / "state.json")
+    source = fingerprint(path)
+
+    # Batches 0 and 2 landed before the crash, batch 1 did not
+    sink = SQLiteSink("imported_classes", db)
+    checkpoint = Checkpoint(state, source, 5)
+    for index in (2, 0):
+        chunk = [coerce_row({"name": n, "price": p, "duration": d}) for n, p, d in rows[index * 5:index * 5 + 5]]
+        sink.prepare(["name", "price", "duration"])
+        sink.insert(chunk, ["name", "price", "duration"])
+        checkpoint.commit(index, len(chunk))
+
+    resumed = Checkpoint.load(state, source, 5)
+    assert (resumed.watermark, resumed.completed, resumed.rows) == (1, {2}, 10)
+
+    summary = import_csv(path, sink, batch_size=5, concurrency=2, checkpoint=resumed)
+
+    assert summary["rows"] == 10
+    assert summary["total_rows"] == 20
+    assert sorted(name for name, _, _ in table_rows(db)) == sorted(name for name, _, _ in rows)
+    assert resumed.watermark == 4 and not resumed.completed
+
+
+def test_checkpoint_refuses_a_different_file(tmp_path):
+    state = str(tmp_path / "state.json")
+    Checkpoint(state, "a", 5).commit(0, 5)
+    with pytest.raises(ImportFailed, match="--restart"):
+        Checkpoint.load(state, "b", 5)
+
+
+def test_main_lists_invalid_lines_and_clears_state(tmp_path, db, capsys):
+    path = write_csv(tmp_path / "export.csv", [("ok", "10", "60"), ("bad", "Infinity", "60")])
+
+    assert import_classes.main([path, "--database", f"sqlite:///{db}", "--batch-size", "1"]) == 0
+
+    out = capsys.readouterr().out
+    assert "✗ line 3: price: not a finite number: 'Infinity'" in out
+    assert "✓ Imported 1 rows" in out
+    assert not (tmp_path / "export.csv.import-state.json").exists()
+
+
+@pytest.mark.parametrize("option", ["--batch-size", "--concurrency"])
+def test_main_rejects_non_positive_sizes(tmp_path, db, option, capsys):
+    path = write_csv(tmp_path / "export.csv", [("ok", "10", "60")])
+
+    with pytest.raises(SystemExit):
+        import_classes.main([path, "--database", f"sqlite:///{db}", option, "0"])
+
+    assert "must be at least 1" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("sizes", [{"batch_size": 0}, {"concurrency": 0}])
+def test_import_csv_rejects_non_positive_sizes(tmp_path, db, sizes):
+    path = write_csv(tmp_path / "export.csv", [("ok", "10", "60")])
+
+    with pytest.raises(ImportFailed, match="at least 1"):
+        import_csv(path, SQLiteSink("imported_classes", db), **sizes)
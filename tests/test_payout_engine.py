@@ -0,0 +1,98 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from benchmarks.bench_payout_engine import (
+    mismatches,
+    reference_from_csv,
+    reference_payouts,
+    synthetic_bookings,
+    write_exports,
+)
+from payout_engine import (
+    NON_POSITIVE,
+    compute_payouts,
+    fetch_bookings,
+    load_bookings,
+    load_csv,
+    payout_report,
+    transfer_list,
+)
+
+
+def booking(id, amount, payment_type="card", credit_value=None, instructor="i-1", account="acct_1"):
+    return {
+        "id": id,
+        "amount": amount,
+        "instructor_id": instructor,
+        "payment_type": payment_type,
+        "credit_value": credit_value,
+        "instructors": {"stripe_account_id": account, "studio_id": "s-1"},
+    }
+
+
+def test_matches_the_route_loop_to_the_cent():
+    records = synthetic_bookings(5000, 200)
+    bookings = load_bookings(records)
+
+    assert mismatches(reference_payouts(records), transfer_list(bookings, compute_payouts(bookings))) == 0
+
+
+def test_json_strings_are_not_amounts():
+    records = [booking("a", "40.00"), booking("b", 50), booking("c", True), booking("d", None, "credits", "9.5")]
+    bookings = load_bookings(records)
+    report = payout_report(bookings, compute_payouts(bookings))
+
+    assert [transfer["amount"] for transfer in report["transfers"]] == [4250]
+    assert {entry["booking_id"] for entry in report["skipped"] if entry["reason"] == NON_POSITIVE} == {"a", "c", "d"}
+
+
+def test_csv_text_is_parsed():
+    records = [
+        {"id": "a", "amount": "40.00", "instructor_id": "i-1", "payment_type": "card", "credit_value": "",
+         "stripe_account_id": "acct_1", "studio_id": "s-1"},
+    ]
+    bookings = load_bookings(records, text=True)
+
+    assert transfer_list(bookings, compute_payouts(bookings))[0]["amount"] == 3400
+
+
+def test_csv_export_matches_the_route_loop(tmp_path):
+    _, csv_path = write_exports(synthetic_bookings(3000, 100), tmp_path)
+    bookings = load_csv(csv_path)
+
+    assert mismatches(reference_from_csv(csv_path), transfer_list(bookings, compute_payouts(bookings))) == 0
+
+
+def test_fetch_pages_csv_into_columns(tmp_path, monkeypatch):
+    lines = open(write_exports(synthetic_bookings(250, 20), tmp_path)[1], newline="").read().splitlines(True)
+    requests = []
+
+    class PostgREST(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.headers)
+            start, end = map(int, self.headers["Range"].split("-"))
+            body = "".join([lines[0]] + lines[1 + start:2 + end]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), PostgREST)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        bookings = fetch_bookings(f"http://127.0.0.1:{server.server_port}", "key", page_size=100)
+    finally:
+        server.shutdown()
+
+    assert [headers["Range"] for headers in requests] == ["0-99", "100-199", "200-299"]
+    assert requests[0]["Accept"] == "text/csv"
+    expected = load_csv(str(tmp_path / "bookings.csv"))
+    assert transfer_list(bookings, compute_payouts(bookings)) == transfer_list(expected, compute_payouts(expected))
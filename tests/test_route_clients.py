@@ -0,0 +1,22 @@
+from fix_remaining_routes import rewrite
+from route_clients import analyze_source, report_to_dict
+
+ARROW_HANDLER = """import { NextResponse } from 'next/server';
+import { createServiceSupabase } from '@/lib/supabase';
+
+export const GET = async () => {
+  const supabase = createServiceSupabase();
+  return NextResponse.json(await supabase.from('classes').select('*'));
+};
+"""
+
+
+def test_analyze_reports_arrow_function_handlers():
+    report = report_to_dict(analyze_source("route.ts", ARROW_HANDLER))
+
+    assert [(handler["name"], handler["per_request"]) for handler in report["handlers"]] == [("GET", 1)]
+    assert report["handlers"][0]["paths"][0]["shareable"]
+
+
+def test_analyze_covers_what_memoize_clients_rewrites():
+    assert "getSupabase()" in rewrite(ARROW_HANDLER, ["memoize-clients"])
@@ -0,0 +1,60 @@
+from route_tokenizer import RouteSource
+
+
+def test_references_ignores_properties_and_object_keys():
+    route = RouteSource("const a = { supabase: 1, other: 2 };\nconst b = { x: 1, supabase: 2 };\nconst c = client.supabase;\n")
+    assert not route.references("supabase")
+
+
+def test_references_counts_shorthand_and_values():
+    assert RouteSource("const a = { supabase };\n").references("supabase")
+    assert RouteSource("const a = { key: supabase };\n").references("supabase")
+    assert RouteSource("const a = ok ? supabase : null;\n").references("supabase")
+
+
+def test_template_literals_are_opaque():
+    source = "const a = `x ${ { b: '}' }[`b`] } const supabase = createClient(${'{'})`;\nconst c = 1;\n"
+    route = RouteSource(source)
+
+    assert [decl.name for decl in route.consts()] == ["a", "c"]
+    assert not route.references("supabase")
+    # Braces inside the template's text never reach the bracket matcher
+    assert all(
+        partner != -1 for token, partner in zip(route.tokens, route.partners) if token.value in "{}()[]"
+    )
+
+
+def test_regex_literals_do_not_open_brackets():
+    route = RouteSource("const braces = /[{(]+/g;\nconst next = 2;\n")
+
+    assert [decl.name for decl in route.consts()] == ["braces", "next"]
+    assert all(token.depth == 0 for token in route.tokens)
+
+
+def test_asi_ends_declarations_at_the_next_statement():
+    route = RouteSource("const a = fetch('x')\n  .then(r => r)\nconst b = 2\nexport async function GET() {\n  return a\n}\n")
+
+    decls = route.consts()
+    assert [decl.name for decl in decls] == ["a", "b"]
+    assert decls[0].init[-1] == ")"
+    assert decls[1].init == ("2",)
+    assert [handler.name for handler in route.handlers()] == ["GET"]
+
+
+def test_asi_statement_boundaries():
+    route = RouteSource("import a from 'a'\nimport { b } from 'b'\nconst c = a(b)\n")
+    imports = [index for index, token in enumerate(route.tokens) if token.value == "import"]
+
+    assert all(route.starts_statement(index) for index in imports)
+    assert route.tokens[route.statement_end(imports[0]) - 1].value == "'a'"
+
+
+def test_handlers_include_exported_arrow_functions():
+    route = RouteSource(
+        "const helper = () => 1\n"
+        "export const GET = async (request: Request) => {\n  return helper()\n}\n"
+        "export async function POST() {\n  return 2\n}\n"
+        "export const config = () => ({})\n"
+    )
+
+    assert [handler.name for handler in route.handlers()] == ["GET", "POST"]
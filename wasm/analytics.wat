@@ -235,10 +235,16 @@
     
     ;; Get lower and upper indices
     (local.set $lower (i32.trunc_f32_s (local.get $index)))
-    (local.set $upper 
-      (i32.min
-        (i32.add (local.get $lower) (i32.const 1))
+    ;; upper = min(lower + 1, len - 1); wasm has no i32.min, so select
+    (local.set $upper (i32.add (local.get $lower) (i32.const 1)))
+    (local.set $upper
+      (select
+        (local.get $upper)
         (i32.sub (local.get $len) (i32.const 1))
+        (i32.lt_s
+          (local.get $upper)
+          (i32.sub (local.get $len) (i32.const 1))
+        )
       )
     )
     